@@ -1,25 +1,23 @@
-import aiohttp
 import json
 from typing import Dict, List, Optional, Union
 from dataclasses import dataclass
 from config import Config
+from cache import LRUCache, hash_key
+from chunking import CodeChunk, split_code
+from semantic_cache import SemanticCache
+from upstream_pool import UpstreamPool, wait_with_timeout
 import logging
 import time
 import asyncio
-
-# Optional cloud imports (only if user wants expensive fallback)
-try:
-    import openai
-except ImportError:
-    openai = None
-    
-try:
-    import anthropic
-except ImportError:
-    anthropic = None
+import importlib.util
+import threading
+from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
 
+# Providers that run on the user's machine and cost nothing per request
+LOCAL_PROVIDERS = ('ollama', 'lm_studio')
+
 @dataclass
 class CodeContext:
     """Context information for code completion requests"""
@@ -29,6 +27,10 @@ class CodeContext:
     prefix: str  # Code before cursor
     suffix: str  # Code after cursor
     surrounding_code: Optional[str] = None
+    
+    def cache_key(self) -> str:
+        """Key identifying this request, and the models that answer it, for completion caches"""
+        return hash_key(Config.get_model_identity(), self.file_path, self.language, self.prefix, self.suffix)
 
 @dataclass
 class CompletionResult:
@@ -44,22 +46,37 @@ class LocalLLMService:
     """Free local LLM service - PRIMARY AI provider"""
     
     def __init__(self):
-        self.session = None
+        self.pool = UpstreamPool()
+    
+    @asynccontextmanager
+    async def _request(self, backend: str, method: str, path: str, payload: Optional[Dict] = None):
+        """Send a request over the backend's pooled session
         
-    async def _get_session(self):
-        """Get or create aiohttp session"""
-        if not self.session:
-            timeout = aiohttp.ClientTimeout(total=Config.LOCAL_MODEL_TIMEOUT)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+        Connect time is bounded by the session; waiting for the response
+        headers is bounded by LOCAL_FIRST_BYTE_TIMEOUT (for non-streaming
+        generation this covers the model's work).
+        """
+        session = await self.pool.session(backend)
+        response = await wait_with_timeout(
+            session.request(method, f"{self.pool.base_url(backend)}{path}", json=payload),
+            Config.LOCAL_FIRST_BYTE_TIMEOUT,
+            f"{backend} first byte"
+        )
+        try:
+            yield response
+        finally:
+            response.release()
+    
+    async def _read_json(self, response):
+        """Read a response body, bounded by LOCAL_READ_TIMEOUT"""
+        return await wait_with_timeout(response.json(), Config.LOCAL_READ_TIMEOUT, "response read")
     
     async def check_ollama_availability(self) -> bool:
         """Check if Ollama is running and has the model"""
         try:
-            session = await self._get_session()
-            async with session.get(f"{Config.OLLAMA_BASE_URL}/api/tags") as response:
+            async with self._request('ollama', 'GET', '/api/tags') as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await self._read_json(response)
                     models = [model['name'] for model in data.get('models', [])]
                     return Config.OLLAMA_MODEL in models
                 return False
@@ -70,8 +87,7 @@ class LocalLLMService:
     async def check_lm_studio_availability(self) -> bool:
         """Check if LM Studio is running"""
         try:
-            session = await self._get_session()
-            async with session.get(f"{Config.LM_STUDIO_BASE_URL}/models") as response:
+            async with self._request('lm_studio', 'GET', '/models') as response:
                 return response.status == 200
         except Exception as e:
             logger.debug(f"LM Studio not available: {e}")
@@ -92,10 +108,9 @@ class LocalLLMService:
             }
         }
         
-        session = await self._get_session()
-        async with session.post(f"{Config.OLLAMA_BASE_URL}/api/generate", json=payload) as response:
+        async with self._request('ollama', 'POST', '/api/generate', payload) as response:
             if response.status == 200:
-                data = await response.json()
+                data = await self._read_json(response)
                 return data.get('response', '').strip()
             else:
                 raise Exception(f"Ollama API error: {response.status}")
@@ -115,10 +130,9 @@ class LocalLLMService:
             "stop": ["\n\n", "```"]
         }
         
-        session = await self._get_session()
-        async with session.post(f"{Config.LM_STUDIO_BASE_URL}/chat/completions", json=payload) as response:
+        async with self._request('lm_studio', 'POST', '/chat/completions', payload) as response:
             if response.status == 200:
-                data = await response.json()
+                data = await self._read_json(response)
                 return data['choices'][0]['message']['content'].strip()
             else:
                 raise Exception(f"LM Studio API error: {response.status}")
@@ -137,10 +151,9 @@ class LocalLLMService:
             }
         }
         
-        session = await self._get_session()
-        async with session.post(f"{Config.OLLAMA_BASE_URL}/api/generate", json=payload) as response:
+        async with self._request('ollama', 'POST', '/api/generate', payload) as response:
             if response.status == 200:
-                data = await response.json()
+                data = await self._read_json(response)
                 return data.get('response', '').strip()
             else:
                 raise Exception(f"Ollama API error: {response.status}")
@@ -159,10 +172,9 @@ class LocalLLMService:
             }
         }
         
-        session = await self._get_session()
-        async with session.post(f"{Config.OLLAMA_BASE_URL}/api/generate", json=payload) as response:
+        async with self._request('ollama', 'POST', '/api/generate', payload) as response:
             if response.status == 200:
-                data = await response.json()
+                data = await self._read_json(response)
                 suggestions_text = data.get('response', '').strip()
                 # Parse suggestions into list
                 suggestions = [s.strip() for s in suggestions_text.split('\n') if s.strip() and len(s.strip()) > 10]
@@ -170,6 +182,42 @@ class LocalLLMService:
             else:
                 raise Exception(f"Ollama API error: {response.status}")
     
+    async def ollama_merge_explanations(self, sections: List[str], language: str) -> str:
+        """Combine per-section explanations of a large file into one summary (FREE)"""
+        joined = "\n\n".join(sections)
+        prompt = f"These are explanations of consecutive sections of one {language} file:\n\n{joined}\n\nSummarize what the whole file does in one short overview:"
+        
+        payload = {
+            "model": Config.OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.3,
+                "num_predict": 200
+            }
+        }
+        
+        async with self._request('ollama', 'POST', '/api/generate', payload) as response:
+            if response.status == 200:
+                data = await self._read_json(response)
+                return data.get('response', '').strip()
+            else:
+                raise Exception(f"Ollama API error: {response.status}")
+    
+    async def ollama_embed(self, text: str) -> List[float]:
+        """Embed text with a local Ollama embedding model (FREE)"""
+        payload = {
+            "model": Config.SEMANTIC_CACHE_EMBED_MODEL,
+            "prompt": text
+        }
+        
+        async with self._request('ollama', 'POST', '/api/embeddings', payload) as response:
+            if response.status == 200:
+                data = await self._read_json(response)
+                return data.get('embedding', [])
+            else:
+                raise Exception(f"Ollama API error: {response.status}")
+    
     def _build_code_prompt(self, context: CodeContext) -> str:
         """Build optimized prompt for code completion"""
         return f"""Complete the {context.language} code at the cursor position.
@@ -187,48 +235,119 @@ Code after cursor:
 Complete the code at <CURSOR>. Provide only the completion code:"""
     
     async def close(self):
-        """Close the session"""
-        if self.session:
-            await self.session.close()
+        """Close the pooled sessions"""
+        await self.pool.close()
 
 class CloudLLMService:
-    """Expensive cloud LLM service - FALLBACK ONLY"""
+    """Expensive cloud LLM service - FALLBACK ONLY
+    
+    The openai/anthropic SDKs are imported on first use, so they cost nothing
+    at startup when no cloud key is configured. Both use async clients with a
+    pooled httpx transport, so a slow cloud round trip never blocks the event
+    loop that local requests are running on.
+    """
+    
+    SYSTEM_PROMPT = "You are a code completion assistant. Provide only the code completion."
     
     def __init__(self):
         self.openai_client = None
         self.anthropic_client = None
-        self._initialize_clients()
     
-    def _initialize_clients(self):
-        """Initialize cloud clients only if API keys are provided"""
-        if Config.OPENAI_API_KEY and openai:
-            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+    @staticmethod
+    def _sdk_installed(module: str) -> bool:
+        return importlib.util.find_spec(module) is not None
+    
+    def is_configured(self, provider: str) -> bool:
+        """Whether a cloud provider has an API key and an installed SDK"""
+        if provider == 'openai':
+            return bool(Config.OPENAI_API_KEY) and self._sdk_installed('openai')
+        if provider == 'anthropic':
+            return bool(Config.ANTHROPIC_API_KEY) and self._sdk_installed('anthropic')
+        return False
+    
+    def _http_client(self):
+        """Pooled keep-alive transport shared by requests to one provider"""
+        import httpx
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.CLOUD_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.CLOUD_MAX_CONNECTIONS
+            ),
+            timeout=Config.CLOUD_MODEL_TIMEOUT
+        )
+    
+    def _get_openai_client(self):
+        """Create the OpenAI client on first use"""
+        if not self.openai_client:
+            if not self.is_configured('openai'):
+                raise Exception("OpenAI not configured")
+            import openai
+            self.openai_client = openai.AsyncOpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                timeout=Config.CLOUD_MODEL_TIMEOUT,
+                http_client=self._http_client()
+            )
             logger.info("⚠️  OpenAI client initialized (COSTS MONEY)")
-            
-        if Config.ANTHROPIC_API_KEY and anthropic:
-            self.anthropic_client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
+        return self.openai_client
+    
+    def _get_anthropic_client(self):
+        """Create the Anthropic client on first use"""
+        if not self.anthropic_client:
+            if not self.is_configured('anthropic'):
+                raise Exception("Anthropic not configured")
+            import anthropic
+            self.anthropic_client = anthropic.AsyncAnthropic(
+                api_key=Config.ANTHROPIC_API_KEY,
+                timeout=Config.CLOUD_MODEL_TIMEOUT,
+                http_client=self._http_client()
+            )
             logger.info("⚠️  Anthropic client initialized (COSTS MONEY)")
+        return self.anthropic_client
     
-    async def openai_completion(self, context: CodeContext) -> str:
-        """Get completion from OpenAI (EXPENSIVE)"""
-        if not self.openai_client:
-            raise Exception("OpenAI not configured")
-            
-        prompt = f"""Complete this {context.language} code at the cursor position. Return only the completion:
+    def _build_prompt(self, context: CodeContext) -> str:
+        return f"""Complete this {context.language} code at the cursor position. Return only the completion:
 
 {context.prefix}<CURSOR>{context.suffix}"""
+    
+    async def openai_completion(self, context: CodeContext) -> str:
+        """Get completion from OpenAI (EXPENSIVE)"""
+        client = self._get_openai_client()
         
-        response = self.openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await client.chat.completions.create(
+            model=Config.OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "You are a code completion assistant. Provide only the code completion."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": self._build_prompt(context)}
             ],
             max_tokens=Config.LOCAL_MODEL_MAX_TOKENS,
-            temperature=Config.LOCAL_MODEL_TEMPERATURE
+            temperature=Config.LOCAL_MODEL_TEMPERATURE,
+            timeout=Config.CLOUD_MODEL_TIMEOUT
         )
         
         return response.choices[0].message.content.strip()
+    
+    async def anthropic_completion(self, context: CodeContext) -> str:
+        """Get completion from Anthropic (EXPENSIVE)"""
+        client = self._get_anthropic_client()
+        
+        response = await client.messages.create(
+            model=Config.ANTHROPIC_MODEL,
+            system=self.SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": self._build_prompt(context)}
+            ],
+            max_tokens=Config.LOCAL_MODEL_MAX_TOKENS,
+            temperature=Config.LOCAL_MODEL_TEMPERATURE,
+            timeout=Config.CLOUD_MODEL_TIMEOUT
+        )
+        
+        return ''.join(block.text for block in response.content if getattr(block, 'text', None)).strip()
+    
+    async def close(self):
+        """Close pooled cloud connections"""
+        for client in (self.openai_client, self.anthropic_client):
+            if client:
+                await client.close()
 
 class AIService:
     """Unified AI service - prioritizes FREE local LLMs over expensive cloud APIs"""
@@ -237,65 +356,139 @@ class AIService:
         self.local_service = LocalLLMService()
         self.cloud_service = CloudLLMService()
         self.provider_priority = Config.get_ai_provider_priority()
+        self.analysis_cache = LRUCache(Config.ANALYSIS_CACHE_SIZE)
+        self.semantic_cache = SemanticCache(
+            max_entries=Config.SEMANTIC_CACHE_SIZE,
+            ttl=Config.SEMANTIC_CACHE_TTL,
+            threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+            embed=self.local_service.ollama_embed if Config.SEMANTIC_CACHE_EMBED_MODEL else None
+        )
         logger.info(f"🚀 AI Service initialized. Priority: {' -> '.join(self.provider_priority)}")
     
-    async def get_code_completion(self, context: CodeContext) -> CompletionResult:
-        """Get AI-powered code completion (FREE local first, expensive cloud fallback)"""
+    async def is_provider_available(self, provider: str) -> bool:
+        """Health-check a provider (local servers are probed, cloud needs a key and SDK)"""
+        if provider == 'ollama':
+            if await self.local_service.check_ollama_availability():
+                return True
+            logger.info("💡 Ollama not available. Install with: curl -fsSL https://ollama.ai/install.sh | sh")
+            return False
+        if provider == 'lm_studio':
+            if await self.local_service.check_lm_studio_availability():
+                return True
+            logger.info("💡 LM Studio not available. Download from: https://lmstudio.ai")
+            return False
+        return self.cloud_service.is_configured(provider)
+    
+    async def complete_with_provider(self, provider: str, context: CodeContext) -> CompletionResult:
+        """Get a completion from one specific provider, without health checks"""
+        start_time = time.time()
+        
+        if provider == 'ollama':
+            completion = await self.local_service.ollama_completion(context)
+            confidence, model_used, cost = 0.85, Config.OLLAMA_MODEL, 0.0
+        elif provider == 'lm_studio':
+            completion = await self.local_service.lm_studio_completion(context)
+            confidence, model_used, cost = 0.80, Config.LM_STUDIO_MODEL, 0.0
+        elif provider == 'openai':
+            logger.warning("💸 Using expensive OpenAI API - consider installing Ollama for free local AI")
+            completion = await self.cloud_service.openai_completion(context)
+            confidence, model_used, cost = 0.90, Config.OPENAI_MODEL, 0.002  # Approximate cost
+        elif provider == 'anthropic':
+            logger.warning("💸 Using expensive Anthropic API - consider installing Ollama for free local AI")
+            completion = await self.cloud_service.anthropic_completion(context)
+            confidence, model_used, cost = 0.90, Config.ANTHROPIC_MODEL, 0.002  # Approximate cost
+        else:
+            raise Exception(f"Unknown provider: {provider}")
+        
+        return CompletionResult(
+            completion=completion,
+            confidence=confidence,
+            model_used=model_used,
+            processing_time=time.time() - start_time,
+            provider=provider,
+            cost=cost
+        )
+    
+    async def get_code_completion(self, context: CodeContext, local_only: bool = False) -> CompletionResult:
+        """Get AI-powered code completion (FREE local first, expensive cloud fallback)
+        
+        Pass local_only=True for speculative work that must never spend money on cloud APIs.
+        """
         start_time = time.time()
         
         for provider in self.provider_priority:
+            if local_only and provider not in LOCAL_PROVIDERS:
+                continue
             try:
-                if provider == 'ollama':
-                    if await self.local_service.check_ollama_availability():
-                        completion = await self.local_service.ollama_completion(context)
-                        return CompletionResult(
-                            completion=completion,
-                            confidence=0.85,
-                            model_used=Config.OLLAMA_MODEL,
-                            processing_time=time.time() - start_time,
-                            provider='ollama',
-                            cost=0.0
-                        )
-                    else:
-                        logger.info("💡 Ollama not available. Install with: curl -fsSL https://ollama.ai/install.sh | sh")
-                        
-                elif provider == 'lm_studio':
-                    if await self.local_service.check_lm_studio_availability():
-                        completion = await self.local_service.lm_studio_completion(context)
-                        return CompletionResult(
-                            completion=completion,
-                            confidence=0.80,
-                            model_used=Config.LM_STUDIO_MODEL,
-                            processing_time=time.time() - start_time,
-                            provider='lm_studio',
-                            cost=0.0
-                        )
-                    else:
-                        logger.info("💡 LM Studio not available. Download from: https://lmstudio.ai")
-                        
-                elif provider == 'openai' and self.cloud_service.openai_client:
-                    logger.warning("💸 Using expensive OpenAI API - consider installing Ollama for free local AI")
-                    completion = await self.cloud_service.openai_completion(context)
-                    return CompletionResult(
-                        completion=completion,
-                        confidence=0.90,
-                        model_used="gpt-3.5-turbo",
-                        processing_time=time.time() - start_time,
-                        provider='openai',
-                        cost=0.002  # Approximate cost
-                    )
-                    
+                if await self.is_provider_available(provider):
+                    result = await self.complete_with_provider(provider, context)
+                    result.processing_time = time.time() - start_time
+                    return result
             except Exception as e:
                 logger.error(f"Provider {provider} failed: {e}")
                 continue
         
         raise Exception("No AI providers available. Install Ollama (free) or configure cloud APIs (expensive)")
     
+    async def _analyze_chunks(self, code: str, language: str, task: str, analyze) -> List[tuple]:
+        """Map step: run analyze(chunk_code, language) per chunk, concurrently and cached
+        
+        Returns (chunk, result) pairs in file order. Unchanged chunks are served
+        from the per-chunk cache, so re-analysing an edited file only re-runs
+        the chunks that changed.
+        """
+        # Parsing a large file is CPU-bound; keep it off the shared event loop
+        chunks = await asyncio.to_thread(split_code, code, language, Config.ANALYSIS_CHUNK_CHARS)
+        semaphore = asyncio.Semaphore(max(1, Config.ANALYSIS_MAX_FANOUT))
+        
+        async def run(chunk: CodeChunk):
+            key = chunk.digest(language, task)
+            cached = self.analysis_cache.get(key)
+            if cached is not None:
+                return chunk, cached
+            async with semaphore:
+                result = await analyze(chunk.code, language)
+            self.analysis_cache.set(key, result)
+            return chunk, result
+        
+        return await asyncio.gather(*(run(chunk) for chunk in chunks))
+    
+    async def _explain_chunked(self, code: str, language: str) -> str:
+        """Explain per chunk, then summarize when the file needed more than one"""
+        results = await self._analyze_chunks(code, language, 'explain', self.local_service.ollama_explain)
+        if len(results) == 1:
+            return results[0][1]
+        
+        sections = [f"Lines {chunk.start_line}+ ({chunk.name}): {explanation}" for chunk, explanation in results]
+        summary = await self.local_service.ollama_merge_explanations(sections, language)
+        return summary + "\n\n" + "\n\n".join(sections)
+    
+    async def _improve_chunked(self, code: str, language: str) -> List[str]:
+        """Suggest improvements per chunk, labelled by section and de-duplicated"""
+        results = await self._analyze_chunks(code, language, 'improve', self.local_service.ollama_improve)
+        if len(results) == 1:
+            return results[0][1]
+        
+        merged = []
+        seen = set()
+        for chunk, suggestions in results:
+            for suggestion in suggestions:
+                if suggestion.lower() not in seen:
+                    seen.add(suggestion.lower())
+                    merged.append(f"[{chunk.name}] {suggestion}")
+        return merged
+    
     async def explain_code(self, code: str, language: str) -> str:
-        """Explain code (FREE local first)"""
+        """Explain code (FREE local first); near-duplicates of earlier requests are served from cache"""
         try:
+            cached, key = await self.semantic_cache.lookup('explain', language, code)
+            if cached is not None:
+                return cached
+            
             if await self.local_service.check_ollama_availability():
-                return await self.local_service.ollama_explain(code, language)
+                explanation = await self._explain_chunked(code, language)
+                self.semantic_cache.store(key, explanation)
+                return explanation
             else:
                 return "Install Ollama for free code explanations: curl -fsSL https://ollama.ai/install.sh | sh"
         except Exception as e:
@@ -303,10 +496,16 @@ class AIService:
             return f"Error: {str(e)}. Install Ollama for free AI: https://ollama.ai"
     
     async def suggest_improvements(self, code: str, language: str) -> List[str]:
-        """Suggest code improvements (FREE local first)"""
+        """Suggest code improvements (FREE local first); near-duplicates of earlier requests are served from cache"""
         try:
+            cached, key = await self.semantic_cache.lookup('improve', language, code)
+            if cached is not None:
+                return cached
+            
             if await self.local_service.check_ollama_availability():
-                return await self.local_service.ollama_improve(code, language)
+                suggestions = await self._improve_chunked(code, language)
+                self.semantic_cache.store(key, suggestions)
+                return suggestions
             else:
                 return ["Install Ollama for free code suggestions: curl -fsSL https://ollama.ai/install.sh | sh"]
         except Exception as e:
@@ -316,6 +515,17 @@ class AIService:
     async def close(self):
         """Clean up resources"""
         await self.local_service.close()
+        await self.cloud_service.close()
+
+# Global AI service instance, built on first use so startup stays fast
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
 
-# Global AI service instance
-ai_service = AIService()
+def get_ai_service() -> AIService:
+    """Return the global AI service, constructing it on first call"""
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
@@ -1,14 +1,21 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import asyncio
 import logging
 from typing import Dict, Any
 import traceback
 from datetime import datetime
+from dataclasses import asdict
 
 from config import Config
-from ai_service import ai_service, CodeContext
+from ai_service import get_ai_service, CodeContext, CompletionResult
+from async_runner import runner
 from code_validator import validate_and_format_python
+from prefetch import prefetcher
+from cache import hash_key
+from shared_cache import shared_cache
+from json_codec import configure_json
+from batch import parse_items, stream_batch
+from compression import RequestBodyMiddleware, compress, supported_encodings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,10 +24,41 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_FILE_SIZE_MB * 1024 * 1024
+configure_json(app, Config.JSON_CODEC)
+
+# Reject oversized bodies and decompress gzip/zstd ones before Flask parses them
+app.wsgi_app = RequestBodyMiddleware(app.wsgi_app, app.config['MAX_CONTENT_LENGTH'])
 
 # Enable CORS for frontend integration
 CORS(app, origins=Config.CORS_ORIGINS)
 
+def run_async(coro):
+    """Run a coroutine on the shared AI service loop, counted as live traffic for prefetch budgeting"""
+    with prefetcher.live_request():
+        return runner.run(coro)
+
+@app.after_request
+def compress_response(response):
+    """Compress larger responses for clients that send Accept-Encoding gzip/zstd"""
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if not encoding:
+        return response
+    
+    data = response.get_data()
+    if len(data) < Config.COMPRESSION_MIN_BYTES:
+        return response
+    
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 # Validate configuration on startup
 config_issues = Config.validate_config()
 if config_issues:
@@ -67,11 +105,20 @@ def code_completion():
             surrounding_code=data.get('surrounding_code')
         )
         
-        # Get completion asynchronously
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(ai_service.get_code_completion(context))
-        loop.close()
+        # Serve a speculatively prefetched completion if we predicted this request,
+        # then anything another worker already computed for it
+        result = prefetcher.lookup(context)
+        if result is None:
+            cached = shared_cache.get('completion', context.cache_key())
+            if cached is not None:
+                result = CompletionResult(**dict(cached, processing_time=0.0))
+        if result is None:
+            # Get completion asynchronously
+            result = run_async(get_ai_service().get_code_completion(context))
+            shared_cache.set('completion', context.cache_key(), asdict(result))
+        
+        # Warm the cache for the request that follows if this completion is accepted
+        prefetcher.schedule(context, result)
         
         return jsonify({
             "completion": result.completion,
@@ -85,6 +132,36 @@ def code_completion():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/complete/batch", methods=["POST"])
+def batch_code_completion():
+    """Bulk code completion, streamed back as NDJSON as each item finishes"""
+    try:
+        data = request.get_json()
+        
+        raw_items = data.get('items')
+        if not isinstance(raw_items, list) or not raw_items:
+            return jsonify({"error": "Missing or empty 'items' list"}), 400
+        if len(raw_items) > Config.BATCH_MAX_ITEMS:
+            return jsonify({"error": f"Too many items: {len(raw_items)} (max {Config.BATCH_MAX_ITEMS})"}), 400
+        
+        # Resuming: ids the client already has results for are not run again
+        raw_skip_ids = data.get('skip_ids', [])
+        if not isinstance(raw_skip_ids, list):
+            return jsonify({"error": "'skip_ids' must be a list"}), 400
+        skip_ids = {str(item_id) for item_id in raw_skip_ids}
+        items, invalid, skipped = parse_items(raw_items, skip_ids)
+        allow_cloud = bool(data.get('allow_cloud', False))
+        
+        def generate():
+            with prefetcher.live_request():
+                yield from stream_batch(items, invalid, skipped, app.json.dumps, allow_cloud=allow_cloud)
+        
+        return Response(generate(), mimetype="application/x-ndjson")
+        
+    except Exception as e:
+        logger.error(f"Batch completion error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/explain", methods=["POST"])
 def explain_code():
     """Code explanation endpoint"""
@@ -94,12 +171,9 @@ def explain_code():
         if 'code' not in data or 'language' not in data:
             return jsonify({"error": "Missing 'code' or 'language' field"}), 400
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        explanation = loop.run_until_complete(
-            ai_service.explain_code(data['code'], data['language'])
+        explanation = run_async(
+            get_ai_service().explain_code(data['code'], data['language'])
         )
-        loop.close()
         
         return jsonify({"explanation": explanation})
         
@@ -116,12 +190,9 @@ def suggest_improvements():
         if 'code' not in data or 'language' not in data:
             return jsonify({"error": "Missing 'code' or 'language' field"}), 400
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        suggestions = loop.run_until_complete(
-            ai_service.suggest_improvements(data['code'], data['language'])
+        suggestions = run_async(
+            get_ai_service().suggest_improvements(data['code'], data['language'])
         )
-        loop.close()
         
         return jsonify({"suggestions": suggestions})
         
@@ -141,7 +212,11 @@ def format_code():
         language = data.get('language', 'python')
         
         if language == 'python':
-            formatted_code = validate_and_format_python(data['code'])
+            key = hash_key(language, data['code'])
+            formatted_code = shared_cache.get('format', key)
+            if formatted_code is None:
+                formatted_code = validate_and_format_python(data['code'])
+                shared_cache.set('format', key, formatted_code)
             return jsonify({
                 "formatted_code": formatted_code,
                 "language": language,
@@ -189,8 +264,13 @@ def system_status():
         "ai_services": {
             "openai_available": bool(Config.OPENAI_API_KEY),
             "anthropic_available": bool(Config.ANTHROPIC_API_KEY),
-            "default_model": Config.DEFAULT_AI_MODEL
+            "default_provider": Config.DEFAULT_AI_PROVIDER
         },
+        "prefetch": prefetcher.get_stats(),
+        "analysis_cache": get_ai_service().analysis_cache.get_stats(),
+        "semantic_cache": get_ai_service().semantic_cache.get_stats(),
+        "upstream_pool": get_ai_service().local_service.pool.get_stats(),
+        "shared_cache": shared_cache.get_stats(),
         "configuration": {
             "max_file_size_mb": Config.MAX_FILE_SIZE_MB,
             "supported_languages": Config.SUPPORTED_LANGUAGES
@@ -238,12 +318,9 @@ def openai_compatible_chat():
             
             if cursor_line == -1:
                 # No cursor found, treat as explanation request
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                explanation = loop.run_until_complete(
-                    ai_service.explain_code(content, 'python')
+                explanation = run_async(
+                    get_ai_service().explain_code(content, 'python')
                 )
-                loop.close()
                 
                 return jsonify({
                     "choices": [{
@@ -266,10 +343,7 @@ def openai_compatible_chat():
                 suffix='\n'.join(suffix_lines)
             )
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(ai_service.get_code_completion(context))
-            loop.close()
+            result = run_async(get_ai_service().get_code_completion(context))
             
             return jsonify({
                 "choices": [{
@@ -285,12 +359,9 @@ def openai_compatible_chat():
         
         else:
             # Treat as general code question
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            explanation = loop.run_until_complete(
-                ai_service.explain_code(content, 'python')
+            explanation = run_async(
+                get_ai_service().explain_code(content, 'python')
             )
-            loop.close()
             
             return jsonify({
                 "choices": [{
@@ -324,10 +395,7 @@ def openai_compatible_completions():
             suffix=""
         )
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(ai_service.get_code_completion(context))
-        loop.close()
+        result = run_async(get_ai_service().get_code_completion(context))
         
         return jsonify({
             "choices": [{
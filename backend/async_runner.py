@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+
+class AsyncRunner:
+    """A single long-lived event loop on a background thread
+
+    Flask handlers are synchronous, so they hand their coroutines to this
+    loop and wait for the result. Keeping one loop for the whole process lets
+    aiohttp/httpx connection pools be reused across requests, and lets a slow
+    upstream call wait without blocking anyone else's request.
+    """
+
+    def __init__(self, name: str = "ai-service-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The background loop, started on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine without waiting for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop and block until it finishes"""
+        return self.submit(coro).result(timeout)
+
+
+# Global runner shared by the API layer and background work
+runner = AsyncRunner()
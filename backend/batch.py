@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import queue
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from config import Config
+from ai_service import LOCAL_PROVIDERS, CodeContext, CompletionResult, get_ai_service
+from async_runner import runner
+from shared_cache import shared_cache
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ['id', 'file_path', 'language', 'prefix', 'suffix', 'cursor_position']
+
+
+@dataclass
+class BatchItem:
+    """One completion request within a batch, identified by a client-chosen id"""
+    id: str
+    context: CodeContext
+
+
+def parse_items(raw_items: List[Dict], skip_ids: Set[str]) -> Tuple[List[BatchItem], List[Dict], int]:
+    """Build batch items, returning (items, error lines for invalid items, skipped count)"""
+    items: List[BatchItem] = []
+    errors: List[Dict] = []
+    skipped = 0
+    seen: Set[str] = set()
+
+    for index, raw in enumerate(raw_items):
+        if not isinstance(raw, dict):
+            errors.append({"id": None, "index": index, "error": "Item must be an object"})
+            continue
+        missing = [field for field in REQUIRED_FIELDS if field not in raw]
+        if missing:
+            errors.append({"id": raw.get('id'), "index": index, "error": f"Missing required field: {missing[0]}"})
+            continue
+
+        item_id = str(raw['id'])
+        if item_id in seen:
+            errors.append({"id": item_id, "index": index, "error": "Duplicate item id"})
+            continue
+        seen.add(item_id)
+        if item_id in skip_ids:
+            skipped += 1
+            continue
+
+        items.append(BatchItem(
+            id=item_id,
+            context=CodeContext(
+                file_path=raw['file_path'],
+                language=raw['language'],
+                cursor_position=raw['cursor_position'],
+                prefix=raw['prefix'],
+                suffix=raw['suffix'],
+                surrounding_code=raw.get('surrounding_code')
+            )
+        ))
+    return items, errors, skipped
+
+
+def _result_line(item_id: str, result: CompletionResult, cached: bool) -> Dict:
+    return {
+        "id": item_id,
+        "completion": result.completion,
+        "confidence": result.confidence,
+        "model_used": result.model_used,
+        "provider": result.provider,
+        "processing_time": result.processing_time,
+        "cached": cached
+    }
+
+
+async def run_batch(items: List[BatchItem], emit: Callable[[Dict], None], allow_cloud: bool = False) -> List[str]:
+    """Complete items with bounded concurrency per available provider
+
+    Providers are health-checked once for the whole batch. Each available
+    provider gets BATCH_CONCURRENCY_PER_PROVIDER workers pulling from a
+    shared queue, so throughput grows with the number of backends. Results
+    are emitted as each item finishes; an item whose provider fails is
+    retried on the other available providers before reporting an error.
+    Returns the providers used.
+    """
+    service = get_ai_service()
+    candidates = [p for p in service.provider_priority if allow_cloud or p in LOCAL_PROVIDERS]
+    checks = await asyncio.gather(*(service.is_provider_available(p) for p in candidates), return_exceptions=True)
+    providers = [p for p, available in zip(candidates, checks) if available is True]
+
+    if not providers:
+        for item in items:
+            emit({"id": item.id, "error": "No AI providers available"})
+        return providers
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        pending.put_nowait(item)
+
+    async def complete(item: BatchItem, provider: str) -> Tuple[CompletionResult, bool]:
+        key = item.context.cache_key()
+        # SQLite calls block, so keep them off the shared event loop
+        cached = await asyncio.to_thread(shared_cache.get, 'completion', key)
+        if cached is not None:
+            return CompletionResult(**dict(cached, processing_time=0.0)), True
+
+        fallbacks = [provider] + [p for p in providers if p != provider]
+        error = None
+        for candidate in fallbacks:
+            try:
+                result = await service.complete_with_provider(candidate, item.context)
+                await asyncio.to_thread(shared_cache.set, 'completion', key, asdict(result))
+                return result, False
+            except Exception as e:
+                logger.warning(f"Batch item {item.id} failed on {candidate}: {e}")
+                error = e
+        raise error
+
+    async def worker(provider: str):
+        while True:
+            try:
+                item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                result, cached = await complete(item, provider)
+                emit(_result_line(item.id, result, cached))
+            except Exception as e:
+                emit({"id": item.id, "error": str(e)})
+
+    per_provider = max(1, Config.BATCH_CONCURRENCY_PER_PROVIDER)
+    await asyncio.gather(*(worker(p) for p in providers for _ in range(per_provider)))
+    return providers
+
+
+def stream_batch(items: List[BatchItem], initial_lines: List[Dict], skipped: int,
+                 encode: Callable[[Dict], str], allow_cloud: bool = False) -> Iterator[str]:
+    """Run a batch on the shared event loop and yield NDJSON lines as items finish
+
+    The last line is a summary. Clients resume an interrupted batch by
+    re-sending it with the ids they already have in `skip_ids`.
+    """
+    start_time = time.time()
+    lines: "queue.Queue[Optional[Dict]]" = queue.Queue()
+    counts = {"completed": 0, "failed": 0, "cached": 0}
+
+    for line in initial_lines:
+        counts["failed"] += 1
+        yield encode(line) + "\n"
+
+    async def produce():
+        try:
+            return await run_batch(items, lines.put, allow_cloud=allow_cloud)
+        finally:
+            lines.put(None)
+
+    future = runner.submit(produce())
+    try:
+        while True:
+            line = lines.get()
+            if line is None:
+                break
+            if "error" in line:
+                counts["failed"] += 1
+            else:
+                counts["completed"] += 1
+                counts["cached"] += int(line["cached"])
+            yield encode(line) + "\n"
+
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Batch run failed: {error}")
+        providers = future.result() if error is None else []
+        yield encode({
+            "done": True,
+            "completed": counts["completed"],
+            "failed": counts["failed"],
+            "cached": counts["cached"],
+            "skipped": skipped,
+            "providers": providers,
+            "elapsed": round(time.time() - start_time, 3)
+        }) + "\n"
+    finally:
+        # Client went away mid-stream: stop scheduling the rest of the batch
+        future.cancel()
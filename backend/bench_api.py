@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the API encoding layer
+
+    python backend/bench_api.py [--size-kb 256] [--rounds 200]
+
+Compares stdlib json with orjson on a large /api/complete request and an
+explain response, measures gzip/zstd compression of that response, and the
+cost of rejecting an oversized body in RequestBodyMiddleware versus
+reading and parsing it.
+"""
+
+import argparse
+import gzip
+import io
+import json
+import time
+
+from compression import RequestBodyMiddleware, compress, supported_encodings
+
+SAMPLE_CODE = '''def fibonacci(n: int) -> int:
+    """Return the n-th Fibonacci number"""
+    if n <= 1:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+
+
+class Cache:
+    def __init__(self):
+        self.items = {}
+
+    def get(self, key, default=None):
+        return self.items.get(key, default)
+
+'''
+
+
+def timed(fn, rounds: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench_json(size_kb: int, rounds: int):
+    code = (SAMPLE_CODE * (size_kb * 1024 // len(SAMPLE_CODE) + 1))[:size_kb * 1024]
+    request = {
+        "file_path": "example.py", "language": "python", "cursor_position": len(code),
+        "prefix": code, "suffix": code[: len(code) // 4]
+    }
+    response = {"explanation": "This function computes Fibonacci numbers recursively. " * (size_kb * 8)}
+    request_bytes = json.dumps(request).encode('utf-8')
+
+    print(f"JSON ({len(request_bytes) / 1024:.0f} KB request, {len(json.dumps(response)) / 1024:.0f} KB response)")
+    print(f"  stdlib  loads request : {timed(lambda: json.loads(request_bytes), rounds):10.1f} us")
+    print(f"  stdlib  dumps response: {timed(lambda: json.dumps(response).encode('utf-8'), rounds):10.1f} us")
+    try:
+        import orjson
+        print(f"  orjson  loads request : {timed(lambda: orjson.loads(request_bytes), rounds):10.1f} us")
+        print(f"  orjson  dumps response: {timed(lambda: orjson.dumps(response), rounds):10.1f} us")
+    except ImportError:
+        print("  orjson not installed")
+    return json.dumps(response).encode('utf-8'), request_bytes
+
+
+def bench_compression(payload: bytes, rounds: int):
+    print(f"Compression ({len(payload) / 1024:.0f} KB response)")
+    for encoding in supported_encodings():
+        compressed = compress(payload, encoding)
+        print(f"  {encoding:5}: {timed(lambda: compress(payload, encoding), rounds):10.1f} us, "
+              f"{len(compressed) / 1024:.1f} KB ({len(compressed) / len(payload):.1%})")
+
+
+def bench_body_cap(request_bytes: bytes, rounds: int):
+    def parse_app(environ, start_response):
+        json.loads(environ['wsgi.input'].read(int(environ['CONTENT_LENGTH'])))
+        start_response('200 OK', [])
+        return [b'']
+
+    def call(app, body: bytes, extra=None):
+        environ = {'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)}
+        environ.update(extra or {})
+        return app(environ, lambda status, headers: None)
+
+    capped = RequestBodyMiddleware(parse_app, max_bytes=len(request_bytes) // 2)
+    gzipped = gzip.compress(request_bytes)
+    print(f"Body cap ({len(request_bytes) / 1024:.0f} KB body, cap {capped.max_bytes / 1024:.0f} KB)")
+    print(f"  read + parse uncapped : {timed(lambda: call(parse_app, request_bytes), rounds):10.1f} us")
+    print(f"  rejected by middleware: {timed(lambda: call(capped, request_bytes), rounds):10.1f} us")
+    uncapped = RequestBodyMiddleware(parse_app, max_bytes=len(request_bytes) * 2)
+    print(f"  gzip body inflate+parse: {timed(lambda: call(uncapped, gzipped, {'HTTP_CONTENT_ENCODING': 'gzip'}), rounds):9.1f} us "
+          f"({len(gzipped) / 1024:.0f} KB on the wire)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API JSON codec and compression")
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    response_bytes, request_bytes = bench_json(args.size_kb, args.rounds)
+    bench_compression(response_bytes, args.rounds)
+    bench_body_cap(request_bytes, args.rounds)
@@ -0,0 +1,193 @@
+import ast
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+@dataclass
+class CodeChunk:
+    """A contiguous slice of a source file analysed on its own"""
+    name: str
+    code: str
+    start_line: int  # 1-based
+
+    def digest(self, language: str, task: str) -> str:
+        """Stable cache key for this chunk's analysis result"""
+        return hashlib.sha256(f"{task}\0{language}\0{self.code}".encode('utf-8')).hexdigest()
+
+
+# Block = (name, first line index, last line index exclusive), 0-based
+Block = Tuple[str, int, int]
+
+# Lines that typically start a top-level definition in non-Python languages
+_DEFINITION_RE = re.compile(
+    r'^(export\s+)?(default\s+)?(public|private|protected|internal|static|async|pub|abstract|final|\s)*'
+    r'(function|class|interface|struct|enum|impl|trait|fn|func|def|type|module|namespace)\b'
+)
+
+
+def split_code(code: str, language: str, max_chars: int) -> List[CodeChunk]:
+    """Split code on function/class boundaries into chunks of roughly max_chars
+
+    Python is split with the ast module; other languages fall back to
+    splitting at unindented definition lines. Blocks still larger than
+    max_chars (e.g. one huge function) are cut by lines, preferring blank
+    lines and dedents. Adjacent small blocks are packed together so tiny
+    helpers don't each cost a model call.
+    """
+    if len(code) <= max_chars:
+        return [CodeChunk(name="<module>", code=code, start_line=1)]
+
+    lines = code.splitlines(keepends=True)
+    blocks = None
+    if language.lower() == 'python':
+        blocks = _python_blocks(code, lines, max_chars)
+    if blocks is None:
+        blocks = _generic_blocks(lines)
+
+    return _pack(_split_oversized(blocks, lines, max_chars), lines, max_chars)
+
+
+def _python_blocks(code: str, lines: List[str], max_chars: int):
+    """Top-level statements as blocks; oversized classes are split per method"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    blocks: List[Block] = []
+    cursor = 0
+    for node in tree.body:
+        end = node.end_lineno
+        # Leading comments and blank lines belong to the statement that follows
+        if isinstance(node, ast.ClassDef) and _span_chars(lines, cursor, end) > max_chars:
+            blocks.extend(_class_blocks(node, lines, cursor))
+        else:
+            name = getattr(node, 'name', '<module>')
+            blocks.append((name, cursor, end))
+        cursor = end
+
+    if cursor < len(lines):
+        blocks.append(('<module>', cursor, len(lines)))
+    return blocks
+
+
+def _class_blocks(node: ast.ClassDef, lines: List[str], start: int) -> List[Block]:
+    """Class header plus one block per method"""
+    blocks: List[Block] = []
+    cursor = start
+    header = node.name
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            child_start = min([d.lineno for d in child.decorator_list] + [child.lineno]) - 1
+            if child_start > cursor:
+                blocks.append((header, cursor, child_start))
+            blocks.append((f"{node.name}.{child.name}", child_start, child.end_lineno))
+            cursor = child.end_lineno
+    if cursor < node.end_lineno:
+        blocks.append((header, cursor, node.end_lineno))
+    return blocks
+
+
+def _generic_blocks(lines: List[str]) -> List[Block]:
+    """Split at unindented definition lines (or blank-line separated top-level code)"""
+    blocks: List[Block] = []
+    start = 0
+    name = '<module>'
+    for i, line in enumerate(lines):
+        if i == 0 or line[:1].isspace() or not line.strip():
+            continue
+        starts_definition = _DEFINITION_RE.match(line)
+        follows_blank = not lines[i - 1].strip()
+        if starts_definition or follows_blank:
+            blocks.append((name, start, i))
+            start = i
+            name = line.strip()[:60] if starts_definition else '<module>'
+    blocks.append((name, start, len(lines)))
+    return blocks
+
+
+def _split_oversized(blocks: List[Block], lines: List[str], max_chars: int) -> List[Block]:
+    """Cut blocks larger than max_chars into line ranges that fit
+
+    Each cut goes at the last blank-line boundary or dedent seen in the
+    current piece, or mid-block if there is none.
+    """
+    result: List[Block] = []
+    for name, start, end in blocks:
+        if _span_chars(lines, start, end) <= max_chars:
+            result.append((name, start, end))
+            continue
+
+        pieces: List[Tuple[int, int]] = []
+        piece_start, size, last_break, prev_indent = start, 0, None, None
+        for i in range(start, end):
+            line = lines[i]
+            if line.strip():
+                indent = len(line) - len(line.lstrip())
+                dedents = prev_indent is not None and indent < prev_indent
+                if i > piece_start and (dedents or not lines[i - 1].strip()):
+                    last_break = i
+                prev_indent = indent
+            if i > piece_start and size + len(line) > max_chars:
+                cut = last_break if last_break is not None and last_break > piece_start else i
+                pieces.append((piece_start, cut))
+                piece_start, last_break = cut, None
+                size = _span_chars(lines, cut, i)
+            size += len(line)
+        pieces.append((piece_start, end))
+        result.extend((f"{name} (part {n})", piece_start, piece_end)
+                      for n, (piece_start, piece_end) in enumerate(pieces, 1))
+    return result
+
+
+def _pack(blocks: List[Block], lines: List[str], max_chars: int) -> List[CodeChunk]:
+    """Merge adjacent blocks into chunks at content-defined boundaries
+
+    Whether a block ends its chunk depends only on that block (see
+    _ends_chunk), not on how much came before it, so editing one function
+    leaves the other chunks, and their cached analyses, unchanged. A chunk
+    is also cut early when the next block would push it past max_chars.
+    """
+    chunks: List[CodeChunk] = []
+    names: List[str] = []
+    start = end = None
+    target = max(1, max_chars // 2)
+
+    def flush():
+        if start is not None and end > start:
+            text = ''.join(lines[start:end])
+            if text.strip():
+                chunks.append(CodeChunk(name=', '.join(names), code=text, start_line=start + 1))
+
+    for name, block_start, block_end in blocks:
+        if start is not None and _span_chars(lines, start, block_end) > max_chars:
+            flush()
+            start, names = None, []
+        if start is None:
+            start = block_start
+        end = block_end
+        if name not in names:
+            names.append(name)
+        if _ends_chunk(name, lines, block_start, block_end, target):
+            flush()
+            start, names = None, []
+    flush()
+    return chunks
+
+
+def _ends_chunk(name: str, lines: List[str], start: int, end: int, target: int) -> bool:
+    """Content-defined boundary: true with probability size/target, decided by the block's header
+
+    Hashing the name and first line rather than the whole block keeps the
+    decision stable while the block's body is being edited; chunks average
+    about `target` characters.
+    """
+    header = f"{name}\0{lines[start].strip() if start < end else ''}"
+    roll = int.from_bytes(hashlib.sha256(header.encode('utf-8')).digest()[:8], 'big') / 2 ** 64
+    return roll < _span_chars(lines, start, end) / target
+
+
+def _span_chars(lines: List[str], start: int, end: int) -> int:
+    return sum(len(line) for line in lines[start:end])
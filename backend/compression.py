@@ -0,0 +1,104 @@
+import gzip
+import importlib.util
+import io
+import json
+import zlib
+from typing import List, Optional
+
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def zstd_available() -> bool:
+    return importlib.util.find_spec('zstandard') is not None
+
+
+def supported_encodings() -> List[str]:
+    """Content codings we can produce and accept, best first"""
+    return ['zstd', 'gzip'] if zstd_available() else ['gzip']
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: str, max_bytes: int) -> Optional[bytes]:
+    """Decompress a request body; None if it would expand past max_bytes"""
+    if encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        output = decompressor.decompress(data, max_bytes + 1)
+    elif encoding == 'zstd':
+        import zstandard
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+            output = reader.read(max_bytes + 1)
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    return output if len(output) <= max_bytes else None
+
+
+class RequestBodyMiddleware:
+    """WSGI middleware that caps and decompresses request bodies before Flask sees them
+
+    Oversized bodies are rejected from the Content-Length header alone, so
+    nothing is read or parsed. Bodies sent with Content-Encoding gzip/zstd
+    (or without a Content-Length) are read up to the cap, decompressed with
+    the same cap on the output, and handed on as plain bytes.
+    """
+
+    def __init__(self, wsgi_app, max_bytes: int):
+        self.wsgi_app = wsgi_app
+        self.max_bytes = max_bytes
+
+    def __call__(self, environ, start_response):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or -1)
+        except ValueError:
+            length = -1
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+
+        if length > self.max_bytes:
+            return self._error(start_response, 413, "Request Entity Too Large", "Request body too large")
+
+        if encoding in ('', 'identity') and length >= 0:
+            return self.wsgi_app(environ, start_response)
+
+        has_body = length > 0 or environ.get('wsgi.input_terminated') or environ.get('HTTP_TRANSFER_ENCODING')
+        if not has_body:
+            return self.wsgi_app(environ, start_response)
+
+        to_read = min(length, self.max_bytes + 1) if length >= 0 else self.max_bytes + 1
+        body = environ['wsgi.input'].read(to_read)
+        if len(body) > self.max_bytes:
+            return self._error(start_response, 413, "Request Entity Too Large", "Request body too large")
+
+        if encoding not in ('', 'identity'):
+            if encoding not in supported_encodings():
+                return self._error(start_response, 415, "Unsupported Media Type", f"Unsupported Content-Encoding: {encoding}")
+            try:
+                body = decompress(body, encoding, self.max_bytes)
+            except Exception:
+                return self._error(start_response, 400, "Bad Request", "Malformed compressed request body")
+            if body is None:
+                return self._error(start_response, 413, "Request Entity Too Large", "Decompressed request body too large")
+            environ.pop('HTTP_CONTENT_ENCODING', None)
+
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        environ.pop('HTTP_TRANSFER_ENCODING', None)
+        environ.pop('wsgi.input_terminated', None)
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _error(start_response, status: int, reason: str, message: str):
+        body = json.dumps({"error": message}).encode('utf-8')
+        start_response(f"{status} {reason}", [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body)))
+        ])
+        return [body]
+
@@ -15,6 +15,17 @@ class Config:
     # API Configuration
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', 5000))
+    STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', 3.0))  # Process start to first /ping
+    
+    # Production Server (gunicorn, see backend/gunicorn.conf.py)
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', 0))  # 0 = one per CPU core
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 4))  # Threads per worker; requests mostly wait on the model
+    
+    # Shared Cross-Process Cache (completions and formatting results)
+    SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', 'True').lower() == 'true'
+    SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH')  # Defaults to <tmpdir>/selodev_cache.sqlite3
+    SHARED_CACHE_MAX_ENTRIES = int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 10000))
+    SHARED_CACHE_TTL = float(os.getenv('SHARED_CACHE_TTL', 3600))
     
     # Local LLM Configuration (PRIMARY)
     OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
@@ -28,15 +39,53 @@ class Config:
     LOCAL_MODEL_MAX_TOKENS = int(os.getenv('LOCAL_MODEL_MAX_TOKENS', 512))
     LOCAL_MODEL_TEMPERATURE = float(os.getenv('LOCAL_MODEL_TEMPERATURE', 0.1))
     
+    # Local Backend Connection Pool
+    OLLAMA_UNIX_SOCKET = os.getenv('OLLAMA_UNIX_SOCKET')  # Reach Ollama over a Unix domain socket instead of TCP
+    LM_STUDIO_UNIX_SOCKET = os.getenv('LM_STUDIO_UNIX_SOCKET')
+    LOCAL_POOL_LIMIT = int(os.getenv('LOCAL_POOL_LIMIT', 100))  # Total connections per backend
+    LOCAL_POOL_LIMIT_PER_HOST = int(os.getenv('LOCAL_POOL_LIMIT_PER_HOST', 16))
+    LOCAL_KEEPALIVE_TIMEOUT = float(os.getenv('LOCAL_KEEPALIVE_TIMEOUT', 60))  # Idle seconds before a pooled connection closes
+    LOCAL_DNS_CACHE_TTL = int(os.getenv('LOCAL_DNS_CACHE_TTL', 300))
+    LOCAL_CONNECT_TIMEOUT = float(os.getenv('LOCAL_CONNECT_TIMEOUT', 3))
+    LOCAL_FIRST_BYTE_TIMEOUT = float(os.getenv('LOCAL_FIRST_BYTE_TIMEOUT', LOCAL_MODEL_TIMEOUT))  # Includes generation time when not streaming
+    LOCAL_READ_TIMEOUT = float(os.getenv('LOCAL_READ_TIMEOUT', 10))  # Reading the body after the first byte
+    
+    # Speculative Prefetch (predicts the request that follows an accepted completion)
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'False').lower() == 'true'
+    PREFETCH_CACHE_TTL = float(os.getenv('PREFETCH_CACHE_TTL', 30))  # Seconds a prefetched result stays valid
+    PREFETCH_CACHE_SIZE = int(os.getenv('PREFETCH_CACHE_SIZE', 256))
+    PREFETCH_MAX_CONCURRENT = int(os.getenv('PREFETCH_MAX_CONCURRENT', 1))  # Idle-capacity budget, global via the shared cache tier
+    
+    # Batch Completion (/api/complete/batch)
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 1000))
+    BATCH_CONCURRENCY_PER_PROVIDER = int(os.getenv('BATCH_CONCURRENCY_PER_PROVIDER', 2))  # In-flight items per backend
+    
     # Cloud AI Configuration (OPTIONAL FALLBACK)
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')  # Optional - costs money
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')  # Optional - costs money
     DEFAULT_AI_PROVIDER = os.getenv('DEFAULT_AI_PROVIDER', 'ollama')  # ollama, lm_studio, openai, anthropic
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    ANTHROPIC_MODEL = os.getenv('ANTHROPIC_MODEL', 'claude-3-haiku-20240307')
+    CLOUD_MODEL_TIMEOUT = float(os.getenv('CLOUD_MODEL_TIMEOUT', 20))  # Per-request timeout in seconds
+    CLOUD_MAX_CONNECTIONS = int(os.getenv('CLOUD_MAX_CONNECTIONS', 10))  # Pooled connections per provider
     
     # Code Analysis Configuration
     MAX_FILE_SIZE_MB = int(os.getenv('MAX_FILE_SIZE_MB', 10))
+    ANALYSIS_CHUNK_CHARS = int(os.getenv('ANALYSIS_CHUNK_CHARS', 6000))  # Larger inputs are split for explain/improve
+    ANALYSIS_MAX_FANOUT = int(os.getenv('ANALYSIS_MAX_FANOUT', 4))  # Concurrent chunk requests
+    ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', 1024))  # Cached per-chunk results
+    
+    # Near-Duplicate Cache for explain/improve answers
+    SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 512))
+    SEMANTIC_CACHE_TTL = float(os.getenv('SEMANTIC_CACHE_TTL', 86400))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95))  # Cosine similarity for a hit
+    SEMANTIC_CACHE_EMBED_MODEL = os.getenv('SEMANTIC_CACHE_EMBED_MODEL', '')  # e.g. nomic-embed-text; empty = fingerprint only
     SUPPORTED_LANGUAGES = os.getenv('SUPPORTED_LANGUAGES', 'python,javascript,typescript,html,css,json,yaml,go,rust,java,cpp').split(',')
     
+    # API Encoding
+    JSON_CODEC = os.getenv('JSON_CODEC', 'auto')  # auto (orjson if installed), orjson, stdlib
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))  # Smaller responses are sent uncompressed
+    
     # CORS Configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000').split(',')
     
@@ -93,3 +142,18 @@ class Config:
             providers.append('anthropic')
             
         return providers
+    
+    @classmethod
+    def get_model_identity(cls) -> str:
+        """Providers and models that may answer a completion, in priority order
+
+        Part of every completion cache key, so results cached by another
+        model (or another instance sharing the cache file) are never served.
+        """
+        models = {
+            'ollama': cls.OLLAMA_MODEL,
+            'lm_studio': cls.LM_STUDIO_MODEL,
+            'openai': cls.OPENAI_MODEL,
+            'anthropic': cls.ANTHROPIC_MODEL
+        }
+        return ','.join(f"{provider}={models[provider]}" for provider in cls.get_ai_provider_priority())
@@ -0,0 +1,29 @@
+"""Production server settings
+
+    cd backend && gunicorn -c gunicorn.conf.py app:app
+
+Pre-forks one worker per CPU core (override with WEB_WORKERS). Each worker
+is a separate process, so in-memory caches are per worker; completions and
+formatting results are also kept in the shared SQLite cache tier that every
+worker reads and writes.
+"""
+
+import multiprocessing
+
+from config import Config
+from shared_cache import shared_cache
+
+bind = f"{Config.API_HOST}:{Config.API_PORT}"
+workers = Config.WEB_WORKERS or multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = Config.WEB_THREADS
+# A local model call is bounded by its connect, first-byte and read timeouts
+_local_request_timeout = Config.LOCAL_CONNECT_TIMEOUT + Config.LOCAL_FIRST_BYTE_TIMEOUT + Config.LOCAL_READ_TIMEOUT
+timeout = int(max(_local_request_timeout, Config.CLOUD_MODEL_TIMEOUT) * 2)
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    """Create the shared cache file before forking so workers don't race on the schema"""
+    shared_cache.initialize()
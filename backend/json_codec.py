@@ -0,0 +1,44 @@
+import importlib.util
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify
+
+    Falls back to the default provider's `default` hook for types orjson
+    doesn't handle natively. Keys are not sorted, unlike Flask's default.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._orjson.dumps(obj, default=self.default, option=self._options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self._orjson.dumps(obj, default=self.default, option=self._options),
+            mimetype=self.mimetype
+        )
+
+
+def configure_json(app, codec: str):
+    """Install the configured JSON codec: 'auto' (orjson if installed), 'orjson' or 'stdlib'"""
+    if codec == 'stdlib':
+        return
+    if importlib.util.find_spec('orjson') is None:
+        if codec == 'orjson':
+            logger.warning("JSON_CODEC=orjson but orjson is not installed; using stdlib json")
+        return
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import asdict, replace
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from ai_service import get_ai_service, CodeContext, CompletionResult
+from async_runner import runner
+from shared_cache import shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def predict_follow_up(context: CodeContext, completion: str) -> Optional[CodeContext]:
+    """Predict the request the editor sends after the user accepts a completion"""
+    if not completion:
+        return None
+    return replace(
+        context,
+        prefix=context.prefix + completion,
+        cursor_position=context.cursor_position + len(completion)
+    )
+
+
+class CompletionPrefetcher:
+    """Speculatively generates the next completion while the backend is idle
+
+    Prefetches run on the shared background event loop and only start when no
+    live request is in flight; a live request arriving while one runs cancels
+    it, so they never compete with a user for the model. With the shared
+    cache tier enabled, live requests and running prefetches are counted
+    across all worker processes, so the budget holds under gunicorn too;
+    without it the budget is per process and only exact with one worker.
+    Results live in a small TTL cache keyed on the predicted follow-up request,
+    and in the shared tier's 'prefetch' namespace with the same TTL so the
+    follow-up can hit on any worker.
+    """
+
+    SHARED_NAMESPACE = 'prefetch'
+    LIVE_COUNTER = 'live_requests'
+    PREFETCH_COUNTER = 'prefetches'
+    POLL_SECONDS = 0.1  # How often a running prefetch checks other workers for live traffic
+
+    def __init__(self, enabled: bool = Config.PREFETCH_ENABLED,
+                 ttl: float = Config.PREFETCH_CACHE_TTL,
+                 max_entries: int = Config.PREFETCH_CACHE_SIZE,
+                 max_concurrent: int = Config.PREFETCH_MAX_CONCURRENT):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_concurrent = max_concurrent
+
+        self._cache: "OrderedDict[str, Tuple[float, CompletionResult]]" = OrderedDict()
+        self._pending = set()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._live_requests = 0
+        self._prefetches_running = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "scheduled": 0,
+            "completed": 0,
+            "failed": 0,
+            "skipped_busy": 0,
+            "cancelled": 0,
+            "expired": 0
+        }
+
+    @contextmanager
+    def live_request(self):
+        """Mark a user-facing request as in flight, cancelling running prefetches"""
+        if not self.enabled:
+            yield
+            return
+
+        with self._lock:
+            self._live_requests += 1
+            inflight = list(self._inflight.values())
+        shared_cache.adjust_counter(self.LIVE_COUNTER, 1)
+        for future in inflight:
+            future.cancel()
+        try:
+            yield
+        finally:
+            shared_cache.adjust_counter(self.LIVE_COUNTER, -1)
+            with self._lock:
+                self._live_requests -= 1
+
+    def lookup(self, context: CodeContext) -> Optional[CompletionResult]:
+        """Return a prefetched completion for this request, if one is still fresh"""
+        if not self.enabled:
+            return None
+
+        key = context.cache_key()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.pop(key, None)
+            if entry is not None and entry[0] < now:
+                self._stats["expired"] += 1
+                entry = None
+        result = entry[1] if entry is not None else None
+
+        if result is None:
+            # Prefetched by another worker
+            shared = shared_cache.get(self.SHARED_NAMESPACE, key)
+            if shared is not None:
+                result = CompletionResult(**shared)
+
+        with self._lock:
+            self._stats["hits" if result is not None else "misses"] += 1
+        return replace(result, processing_time=0.0) if result is not None else None
+
+    def schedule(self, context: CodeContext, result: CompletionResult):
+        """Queue a low-priority prefetch of the request expected after this result"""
+        if not self.enabled:
+            return
+
+        follow_up = predict_follow_up(context, result.completion)
+        if follow_up is None:
+            return
+
+        key = follow_up.cache_key()
+        with self._lock:
+            if key in self._cache or key in self._pending:
+                return
+            if self._prefetches_running + len(self._pending) >= self.max_concurrent:
+                self._stats["skipped_busy"] += 1
+                return
+            self._pending.add(key)
+            self._stats["scheduled"] += 1
+
+        future = runner.submit(self._prefetch(key, follow_up))
+        with self._lock:
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _prefetch(self, key: str, context: CodeContext):
+        """Generate and cache a follow-up completion if capacity is still idle"""
+        with self._lock:
+            self._pending.discard(key)
+            # Live traffic always wins; drop the prediction rather than queue behind it
+            if self._live_requests > 0:
+                self._stats["skipped_busy"] += 1
+                return
+            self._prefetches_running += 1
+
+        acquired = False
+        try:
+            if shared_cache.enabled:
+                acquired = await asyncio.to_thread(
+                    shared_cache.try_increment, self.PREFETCH_COUNTER, self.max_concurrent, self.LIVE_COUNTER
+                )
+                if not acquired:
+                    with self._lock:
+                        self._stats["skipped_busy"] += 1
+                    return
+
+            result = await self._generate(context)
+            self._store(key, result)
+            # The follow-up may land on another worker
+            await asyncio.to_thread(shared_cache.set, self.SHARED_NAMESPACE, key, asdict(result), self.ttl)
+            with self._lock:
+                self._stats["completed"] += 1
+        except asyncio.CancelledError:
+            with self._lock:
+                self._stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            logger.debug(f"Prefetch failed: {e}")
+            with self._lock:
+                self._stats["failed"] += 1
+        finally:
+            if acquired:
+                # Shielded so a second cancellation can't leak the slot
+                await asyncio.shield(asyncio.to_thread(shared_cache.adjust_counter, self.PREFETCH_COUNTER, -1))
+            with self._lock:
+                self._prefetches_running -= 1
+
+    async def _generate(self, context: CodeContext) -> CompletionResult:
+        """Run the completion, cancelling it if another worker starts a live request"""
+        task = asyncio.ensure_future(get_ai_service().get_code_completion(context, local_only=True))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.POLL_SECONDS if shared_cache.enabled else None)
+                if task in done:
+                    return task.result()
+                if await asyncio.to_thread(shared_cache.counter_total, self.LIVE_COUNTER) > 0:
+                    raise asyncio.CancelledError()
+        finally:
+            task.cancel()
+
+    def _store(self, key: str, result: CompletionResult):
+        """Insert a result, evicting the oldest entries beyond max_entries"""
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """Prefetch counters and hit rate for the status endpoint"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_entries"] = len(self._cache)
+        lookups = stats["hits"] + stats["misses"]
+        stats["enabled"] = self.enabled
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Global prefetcher instance
+prefetcher = CompletionPrefetcher()
@@ -0,0 +1,331 @@
+import ast
+import asyncio
+import keyword
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from cache import LRUCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+# Words treated as syntax rather than identifiers when normalising non-Python code
+_COMMON_KEYWORDS = {
+    'abstract', 'async', 'await', 'break', 'case', 'catch', 'class', 'const', 'continue',
+    'default', 'defer', 'delete', 'do', 'else', 'enum', 'export', 'extends', 'false', 'final',
+    'finally', 'fn', 'for', 'func', 'function', 'go', 'if', 'impl', 'implements', 'import',
+    'in', 'instanceof', 'interface', 'let', 'loop', 'match', 'mut', 'new', 'nil', 'null',
+    'package', 'private', 'protected', 'pub', 'public', 'return', 'self', 'static', 'struct',
+    'super', 'switch', 'this', 'throw', 'trait', 'true', 'try', 'type', 'typeof', 'undefined',
+    'use', 'var', 'void', 'while', 'yield'
+}
+# Type names, kept verbatim so `int x` and `float x` stay different
+_PRIMITIVE_TYPES = {
+    'any', 'auto', 'bool', 'boolean', 'byte', 'char', 'double', 'f32', 'f64', 'float', 'i8',
+    'i16', 'i32', 'i64', 'int', 'isize', 'long', 'number', 'object', 'short', 'signed',
+    'size_t', 'str', 'string', 'u8', 'u16', 'u32', 'u64', 'uint', 'unsigned', 'usize'
+}
+# Words after which the next identifier is a name the snippet declares
+_DECLARATION_KEYWORDS = {
+    'class', 'const', 'def', 'enum', 'fn', 'func', 'function', 'interface', 'let', 'mut',
+    'struct', 'trait', 'type', 'var'
+}
+
+# Languages whose line comments start with '#'; everything else uses // and /* */
+_HASH_COMMENT_LANGUAGES = {'python', 'ruby', 'perl', 'shell', 'bash', 'sh', 'zsh', 'yaml', 'toml', 'r', 'powershell', 'makefile', 'dockerfile'}
+# Languages whose '#' lines are preprocessor directives, kept verbatim
+_PREPROCESSOR_LANGUAGES = {'c', 'cpp', 'c++', 'objective-c', 'objc', 'csharp', 'c#', 'cs'}
+
+_STRING = r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`'
+_WORD = r'[A-Za-z_]\w*|\d+(?:\.\d+)?|\S'
+
+
+def _token_re(comment: str, directive: str = '') -> "re.Pattern":
+    # Strings come first so comment markers inside them are not treated as comments
+    directive_group = f'(?P<directive>{directive})|' if directive else ''
+    return re.compile(f'(?P<string>{_STRING})|{directive_group}(?P<comment>{comment})|(?P<word>{_WORD})')
+
+
+_HASH_TOKEN_RE = _token_re(r'#[^\n]*')
+_SLASH_TOKEN_RE = _token_re(r'/\*[\s\S]*?\*/|//[^\n]*')
+_PREPROCESSOR_TOKEN_RE = _token_re(r'/\*[\s\S]*?\*/|//[^\n]*', directive=r'(?m:^[ \t]*#[^\n]*)')
+
+
+def _tokenizer(language: str) -> "re.Pattern":
+    if language in _HASH_COMMENT_LANGUAGES:
+        return _HASH_TOKEN_RE
+    if language in _PREPROCESSOR_LANGUAGES:
+        return _PREPROCESSOR_TOKEN_RE
+    return _SLASH_TOKEN_RE
+
+
+class _BoundNames(ast.NodeVisitor):
+    """Collect the names a Python snippet binds itself"""
+
+    def __init__(self):
+        self.names: Set[str] = set()
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, (ast.Store, ast.Del)):
+            self.names.add(node.id)
+
+    def visit_arg(self, node):
+        self.names.add(node.arg)
+        self.generic_visit(node)
+
+    def _visit_definition(self, node):
+        self.names.add(node.name)
+        self.generic_visit(node)
+
+    visit_FunctionDef = _visit_definition
+    visit_AsyncFunctionDef = _visit_definition
+    visit_ClassDef = _visit_definition
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self.names.add(node.name)
+        self.generic_visit(node)
+
+    def visit_alias(self, node):
+        if node.asname:
+            self.names.add(node.asname)
+
+
+class _CanonicalNames(ast.NodeTransformer):
+    """Rename names bound in the snippet to placeholders numbered by first appearance
+
+    Free names (builtins, imported modules, calls into APIs defined
+    elsewhere), attribute names and annotations are kept: `delete_users(db)`
+    vs `list_users(db)` or `x: int` vs `x: str` are different code, not a
+    rename.
+    """
+
+    def __init__(self, bound: Set[str]):
+        self.bound = bound
+        self.names: Dict[str, str] = {}
+
+    def _canonical(self, name: Optional[str]) -> Optional[str]:
+        if name is None or name not in self.bound:
+            return name
+        if name not in self.names:
+            self.names[name] = f"v{len(self.names)}"
+        return self.names[name]
+
+    def visit_Name(self, node):
+        node.id = self._canonical(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._canonical(node.arg)
+        return self.generic_visit(node)
+
+    def _visit_definition(self, node):
+        node.name = self._canonical(node.name)
+        return self.generic_visit(node)
+
+    visit_FunctionDef = _visit_definition
+    visit_AsyncFunctionDef = _visit_definition
+    visit_ClassDef = _visit_definition
+
+    def visit_ExceptHandler(self, node):
+        node.name = self._canonical(node.name)
+        return self.generic_visit(node)
+
+    def visit_alias(self, node):
+        node.asname = self._canonical(node.asname)
+        return node
+
+
+def _is_member(tokens: List[str], i: int) -> bool:
+    """Whether tokens[i] follows `.`, `::` or `->`"""
+    if i >= 1 and tokens[i - 1] == '.':
+        return True
+    return i >= 2 and (tokens[i - 2], tokens[i - 1]) in ((':', ':'), ('-', '>'))
+
+
+def _is_name(tokens: List[str], i: int) -> bool:
+    token = tokens[i]
+    return ((token[0].isalpha() or token[0] == '_')
+            and token not in _COMMON_KEYWORDS and token not in _PRIMITIVE_TYPES
+            and not keyword.iskeyword(token) and not _is_member(tokens, i))
+
+
+def _token_bound_names(tokens: List[str]) -> Set[str]:
+    """Names a non-Python snippet declares, assigns or takes as parameters"""
+    bound: Set[str] = set()
+
+    def at(i: int) -> str:
+        return tokens[i] if 0 <= i < len(tokens) else ''
+
+    for i, token in enumerate(tokens):
+        if not _is_name(tokens, i):
+            continue
+        declared = at(i - 1) in _DECLARATION_KEYWORDS or at(i - 1) in _PRIMITIVE_TYPES
+        assigned = (at(i + 1) == '=' and at(i + 2) not in ('=', '>')) or (at(i + 1), at(i + 2)) == (':', '=')
+        if declared or assigned:
+            bound.add(token)
+
+    # Parameters of declared functions and arrow functions
+    for i, token in enumerate(tokens):
+        if token != '(':
+            continue
+        depth, j = 0, i
+        while j < len(tokens):
+            depth += {'(': 1, ')': -1}.get(tokens[j], 0)
+            if depth == 0:
+                break
+            j += 1
+        is_declaration = at(i - 2) in _DECLARATION_KEYWORDS and at(i - 1) in bound
+        is_arrow = (at(j + 1), at(j + 2)) == ('=', '>')
+        if is_declaration or is_arrow:
+            for k in range(i + 1, j):
+                if at(k - 1) in ('(', ',') and _is_name(tokens, k):
+                    bound.add(tokens[k])
+    return bound
+
+
+def ast_fingerprint(code: str, language: str) -> str:
+    """Hash of the code's structure with local names and formatting stripped
+
+    Python is normalised through its AST; other languages (and Python that
+    doesn't parse) through a token stream with comments dropped. Only names
+    the snippet binds itself (definitions, parameters, assignment targets,
+    import aliases) are renamed in order of first appearance; free names,
+    member names, types, string literals and C preprocessor lines are kept
+    verbatim.
+    """
+    if language.lower() == 'python':
+        try:
+            tree = ast.parse(code)
+            collector = _BoundNames()
+            collector.visit(tree)
+            tree = _CanonicalNames(collector.names).visit(tree)
+            return hash_key('python-ast', ast.dump(tree, annotate_fields=False))
+        except (SyntaxError, ValueError):
+            pass
+
+    tokens: List[str] = []
+    for match in _tokenizer(language.lower()).finditer(code):
+        if match.lastgroup != 'comment':
+            tokens.append(match.group().strip())
+
+    bound = _token_bound_names(tokens)
+    names: Dict[str, str] = {}
+    canonical = [
+        names.setdefault(token, f"v{len(names)}") if token in bound and _is_name(tokens, i) else token
+        for i, token in enumerate(tokens)
+    ]
+    return hash_key('tokens', language.lower(), ' '.join(canonical))
+
+
+@dataclass
+class SemanticKey:
+    """Lookup keys for one piece of code, reused when storing its result"""
+    namespace: str
+    fingerprint: str
+    embedding: Optional[List[float]] = None
+
+
+class SemanticCache:
+    """Near-duplicate cache for explain/improve answers
+
+    Lookups try the normalised AST fingerprint first. On a miss, and when an
+    embedding function is configured, the closest previously analysed code
+    by cosine similarity is used if it clears `threshold`. Entries expire
+    after `ttl` seconds and the least recently used are evicted past
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, threshold: float,
+                 embed: Optional[Callable[[str], Awaitable[List[float]]]] = None):
+        self.threshold = threshold
+        self.embed = embed
+        self._results = LRUCache(max_entries, ttl=ttl)
+        self._vectors: "OrderedDict[Tuple[str, str], Tuple[List[float], float]]" = OrderedDict()
+        self._max_vectors = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    async def lookup(self, task: str, language: str, code: str) -> Tuple[Optional[Any], SemanticKey]:
+        """Return (cached value or None, key to store the fresh result under)
+
+        Fingerprinting and the vector scan are CPU-bound, so they run in a
+        worker thread rather than on the shared event loop.
+        """
+        fingerprint = await asyncio.to_thread(ast_fingerprint, code, language)
+        key = SemanticKey(namespace=f"{task}:{language.lower()}", fingerprint=fingerprint)
+
+        value = self._results.get((key.namespace, key.fingerprint))
+        if value is not None:
+            self._count("exact_hits")
+            return value, key
+
+        if self.embed is not None:
+            try:
+                key.embedding = await self.embed(code)
+            except Exception as e:
+                logger.debug(f"Embedding lookup skipped: {e}")
+            if key.embedding:
+                value = await asyncio.to_thread(self._nearest, key)
+                if value is not None:
+                    self._count("semantic_hits")
+                    return value, key
+
+        self._count("misses")
+        return None, key
+
+    def store(self, key: SemanticKey, value: Any):
+        """Cache a freshly computed answer under both lookup tiers"""
+        self._results.set((key.namespace, key.fingerprint), value)
+        if key.embedding:
+            norm = math.sqrt(sum(x * x for x in key.embedding)) or 1.0
+            with self._lock:
+                self._vectors[(key.namespace, key.fingerprint)] = (key.embedding, norm)
+                self._vectors.move_to_end((key.namespace, key.fingerprint))
+                while len(self._vectors) > self._max_vectors:
+                    self._vectors.popitem(last=False)
+
+    def _nearest(self, key: SemanticKey) -> Optional[Any]:
+        """Best cached answer in the same namespace above the similarity threshold"""
+        probe = key.embedding
+        probe_norm = math.sqrt(sum(x * x for x in probe)) or 1.0
+        with self._lock:
+            candidates = [(k, v) for k, v in self._vectors.items() if k[0] == key.namespace]
+
+        best_key, best_score = None, self.threshold
+        for candidate_key, (vector, norm) in candidates:
+            if len(vector) != len(probe):
+                continue
+            score = sum(a * b for a, b in zip(probe, vector)) / (probe_norm * norm)
+            if score >= best_score:
+                best_key, best_score = candidate_key, score
+        if best_key is None:
+            return None
+
+        value = self._results.get(best_key)
+        if value is None:
+            # Expired or evicted from the result tier; forget its vector too
+            with self._lock:
+                self._vectors.pop(best_key, None)
+        return value
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get_stats(self) -> Dict:
+        """Hit counters per tier and the overall hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["vectors"] = len(self._vectors)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        stats["entries"] = len(self._results)
+        stats["embedding_enabled"] = self.embed is not None
+        stats["threshold"] = self.threshold
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
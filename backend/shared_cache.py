@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """Cross-process cache tier backed by a local SQLite file in WAL mode
+
+    Every worker process opens the same file, so a result computed by one
+    worker is a hit for all of them. Entries expire after `ttl` seconds and
+    the oldest entries are evicted once the table grows past `max_entries`.
+    Hit/miss counters are kept per process and periodically written to the
+    file so any worker can report the hit rate of every worker. Named
+    counters (e.g. requests in flight) are likewise kept per process and
+    summed over the workers that are still alive.
+    """
+
+    PRUNE_EVERY = 100  # Sets between eviction passes
+    WORKER_STATS_MAX_AGE = 3600.0  # Forget workers that stopped reporting
+    STATS_FLUSH_SECONDS = 5.0
+
+    def __init__(self, path: str, max_entries: int, ttl: float, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets_since_prune = 0
+        self._hits = 0
+        self._misses = 0
+        self._stats_flushed_at = 0.0
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections are not thread-safe"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                self._create_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS worker_stats ("
+            "pid INTEGER PRIMARY KEY, hits INTEGER NOT NULL, misses INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            "name TEXT NOT NULL, pid INTEGER NOT NULL, value INTEGER NOT NULL, "
+            "PRIMARY KEY (name, pid))"
+        )
+        self._schema_ready = True
+
+    def initialize(self):
+        """Create the file and schema up front (e.g. in a pre-fork master)
+
+        Uses a throwaway connection so no SQLite handle is inherited by
+        forked workers.
+        """
+        if not self.enabled:
+            return
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._create_schema(conn)
+        finally:
+            conn.close()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the JSON-decoded value, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return None
+
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        self._maybe_flush_stats()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serialisable value for every worker to see
+
+        `ttl` overrides the cache-wide expiry for this entry.
+        """
+        if not self.enabled:
+            return
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time() + (self.ttl if ttl is None else ttl))
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._sets_since_prune += 1
+            prune = self._sets_since_prune >= self.PRUNE_EVERY
+            if prune:
+                self._sets_since_prune = 0
+        if prune:
+            self._prune()
+
+    def adjust_counter(self, name: str, delta: int):
+        """Add delta to this worker's share of a named counter"""
+        if not self.enabled:
+            return
+        try:
+            self._connect().execute(
+                "INSERT INTO counters (name, pid, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, pid) DO UPDATE SET value = value + excluded.value",
+                (name, os.getpid(), delta)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared counter update failed: {e}")
+
+    def counter_total(self, name: str) -> int:
+        """Sum of a named counter over all live workers"""
+        if not self.enabled:
+            return 0
+        try:
+            return self._counter_total(self._connect(), name)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared counter read failed: {e}")
+            return 0
+
+    def try_increment(self, name: str, limit: int, unless: Optional[str] = None) -> bool:
+        """Atomically increment a counter if its total is below limit
+
+        When `unless` names another counter, nothing is incremented while
+        that counter's total is above zero. Returns whether it incremented.
+        """
+        if not self.enabled:
+            return False
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                allowed = self._counter_total(conn, name) < limit and (
+                    unless is None or self._counter_total(conn, unless) == 0
+                )
+                if allowed:
+                    conn.execute(
+                        "INSERT INTO counters (name, pid, value) VALUES (?, ?, 1) "
+                        "ON CONFLICT (name, pid) DO UPDATE SET value = value + 1",
+                        (name, os.getpid())
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return allowed
+        except sqlite3.Error as e:
+            logger.warning(f"Shared counter update failed: {e}")
+            return False
+
+    @staticmethod
+    def _counter_total(conn: sqlite3.Connection, name: str) -> int:
+        total = 0
+        for pid, value in conn.execute("SELECT pid, value FROM counters WHERE name = ? AND value != 0", (name,)).fetchall():
+            if _pid_alive(pid):
+                total += value
+            else:
+                # A worker that died mid-request never decremented its share
+                conn.execute("DELETE FROM counters WHERE name = ? AND pid = ?", (name, pid))
+        return total
+
+    def _prune(self):
+        """Drop expired entries, then the oldest ones beyond max_entries"""
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM worker_stats WHERE updated_at < ?", (now - self.WORKER_STATS_MAX_AGE,))
+            conn.execute(
+                "DELETE FROM entries WHERE rowid IN ("
+                "SELECT rowid FROM entries ORDER BY expires_at ASC "
+                "LIMIT max(0, (SELECT count(*) FROM entries) - ?))",
+                (self.max_entries,)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache eviction failed: {e}")
+
+    def _maybe_flush_stats(self, force: bool = False):
+        """Publish this worker's counters so other workers can report them"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._stats_flushed_at < self.STATS_FLUSH_SECONDS:
+                return
+            self._stats_flushed_at = now
+            hits, misses = self._hits, self._misses
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO worker_stats (pid, hits, misses, updated_at) VALUES (?, ?, ?, ?)",
+                (os.getpid(), hits, misses, now)
+            )
+        except sqlite3.Error as e:
+            logger.debug(f"Shared cache stats flush failed: {e}")
+
+    def get_stats(self) -> Dict:
+        """Hit rate for this worker plus the last published counters of every worker"""
+        if not self.enabled:
+            return {"enabled": False}
+
+        self._maybe_flush_stats(force=True)
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+
+        workers: List[Dict] = []
+        entries = None
+        try:
+            conn = self._connect()
+            entries = conn.execute("SELECT count(*) FROM entries").fetchone()[0]
+            for pid, worker_hits, worker_misses, updated_at in conn.execute(
+                "SELECT pid, hits, misses, updated_at FROM worker_stats ORDER BY pid"
+            ):
+                worker_lookups = worker_hits + worker_misses
+                workers.append({
+                    "pid": pid,
+                    "hits": worker_hits,
+                    "misses": worker_misses,
+                    "hit_rate": round(worker_hits / worker_lookups, 4) if worker_lookups else 0.0,
+                    "updated_at": updated_at
+                })
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache stats read failed: {e}")
+
+        return {
+            "enabled": True,
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "worker_pid": os.getpid(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "workers": workers
+        }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Global shared cache; the file is opened lazily by whichever thread uses it first
+shared_cache = SharedCache(
+    path=Config.SHARED_CACHE_PATH or os.path.join(tempfile.gettempdir(), 'selodev_cache.sqlite3'),
+    max_entries=Config.SHARED_CACHE_MAX_ENTRIES,
+    ttl=Config.SHARED_CACHE_TTL,
+    enabled=Config.SHARED_CACHE_ENABLED
+)
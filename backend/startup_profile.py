@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Cold start profiling for the API server
+
+    python backend/startup_profile.py imports [--top 25]
+        Import-time cost per module when loading app.py (via -X importtime)
+
+    python backend/startup_profile.py budget [--budget 3.0] [--port 5099]
+        Start app.py and time process start -> first successful /ping.
+        Exits non-zero when over budget, so it can gate CI.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from config import Config
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def profile_imports(top: int) -> int:
+    """Print the modules with the highest cumulative import time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+
+    total_us = sum(self_us for _, self_us, _ in rows)
+    print(f"Total import time: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+    return 0
+
+
+def check_budget(budget: float, port: int) -> int:
+    """Time process start to first served /ping; non-zero exit if over budget"""
+    env = dict(os.environ, API_PORT=str(port), API_HOST="127.0.0.1", FLASK_DEBUG="False")
+    url = f"http://127.0.0.1:{port}/ping"
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "app.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    elapsed = None
+    try:
+        # Give up well past the budget so a hung server still fails the check
+        while time.perf_counter() - start < budget * 5:
+            if process.poll() is not None:
+                print(f"❌ Server exited with code {process.returncode} before serving /ping")
+                return 1
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as response:
+                    if response.status == 200:
+                        elapsed = time.perf_counter() - start
+                        break
+            except OSError:
+                time.sleep(0.02)
+    finally:
+        process.terminate()
+        process.wait()
+
+    if elapsed is None:
+        print(f"❌ /ping not served within {budget * 5:.1f}s")
+        return 1
+
+    status = "✅" if elapsed <= budget else "❌"
+    print(f"{status} Cold start to first /ping: {elapsed:.3f}s (budget {budget:.3f}s)")
+    return 0 if elapsed <= budget else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile API server cold start")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    imports_parser = subcommands.add_parser("imports", help="Report import-time cost per module")
+    imports_parser.add_argument("--top", type=int, default=25)
+
+    budget_parser = subcommands.add_parser("budget", help="Check time to first /ping against a budget")
+    budget_parser.add_argument("--budget", type=float, default=Config.STARTUP_BUDGET_SECONDS)
+    budget_parser.add_argument("--port", type=int, default=5099)
+
+    args = parser.parse_args()
+    if args.command == "imports":
+        sys.exit(profile_imports(args.top))
+    sys.exit(check_budget(args.budget, args.port))
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import batch
+from ai_service import CompletionResult
+from batch import parse_items, stream_batch
+from shared_cache import SharedCache
+
+
+class StubService:
+    """Stands in for AIService; providers listed in `failing` always raise"""
+
+    def __init__(self, providers, failing=()):
+        self.provider_priority = list(providers)
+        self.failing = set(failing)
+        self.calls = []
+
+    async def is_provider_available(self, provider):
+        return True
+
+    async def complete_with_provider(self, provider, context):
+        self.calls.append((provider, context.prefix))
+        if provider in self.failing:
+            raise Exception(f"{provider} is down")
+        return CompletionResult(completion=context.prefix.upper(), confidence=0.9, model_used="stub",
+                                processing_time=0.01, provider=provider)
+
+
+def _raw(item_id, prefix=None):
+    return {"id": item_id, "file_path": "a.py", "language": "python", "prefix": prefix or f"p{item_id}",
+            "suffix": "", "cursor_position": 2}
+
+
+def _run(raw_items, skip_ids=()):
+    items, invalid, skipped = parse_items(raw_items, set(skip_ids))
+    lines = [json.loads(line) for line in stream_batch(items, invalid, skipped, json.dumps)]
+    return lines[:-1], lines[-1]
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    cache = SharedCache(path=str(tmp_path / 'cache.sqlite3'), max_entries=100, ttl=60)
+    monkeypatch.setattr(batch, 'shared_cache', cache)
+    return cache
+
+
+def _use(monkeypatch, service):
+    monkeypatch.setattr(batch, 'get_ai_service', lambda: service)
+    return service
+
+
+def test_failed_item_is_retried_on_next_provider(shared, monkeypatch):
+    service = _use(monkeypatch, StubService(['ollama', 'lm_studio'], failing={'ollama'}))
+    results, summary = _run([_raw(i) for i in range(6)])
+
+    assert sorted(line["id"] for line in results) == [str(i) for i in range(6)]
+    assert all(line["provider"] == 'lm_studio' for line in results)
+    assert any(provider == 'ollama' for provider, _ in service.calls)
+    assert summary["completed"] == 6 and summary["failed"] == 0
+
+
+def test_skip_ids_and_duplicates(shared, monkeypatch):
+    _use(monkeypatch, StubService(['ollama']))
+    results, summary = _run([_raw(1), _raw(2), _raw(2), _raw(3)], skip_ids=['3'])
+
+    errors = [line for line in results if "error" in line]
+    assert errors == [{"id": "2", "index": 2, "error": "Duplicate item id"}]
+    assert sorted(line["id"] for line in results if "error" not in line) == ['1', '2']
+    assert summary["skipped"] == 1
+
+
+def test_summary_counts(shared, monkeypatch):
+    _use(monkeypatch, StubService(['ollama']))
+    invalid = {"id": 9, "file_path": "a.py"}
+    results, summary = _run([_raw(1), _raw(2), invalid])
+
+    assert summary["done"] is True
+    assert (summary["completed"], summary["failed"], summary["cached"]) == (2, 1, 0)
+    assert summary["providers"] == ['ollama']
+    assert len(results) == 3
+
+
+def test_all_providers_failing_reports_error(shared, monkeypatch):
+    _use(monkeypatch, StubService(['ollama', 'lm_studio'], failing={'ollama', 'lm_studio'}))
+    results, summary = _run([_raw(1)])
+    assert "error" in results[0]
+    assert (summary["completed"], summary["failed"]) == (0, 1)
+
+
+def test_resent_item_is_served_from_shared_cache(shared, monkeypatch):
+    service = _use(monkeypatch, StubService(['ollama']))
+    _run([_raw(1)])
+    assert len(service.calls) == 1
+
+    results, summary = _run([_raw(1)])
+    assert len(service.calls) == 1
+    assert results[0]["cached"] is True and results[0]["completion"] == "P1"
+    assert (summary["completed"], summary["cached"]) == (1, 1)
@@ -0,0 +1,46 @@
+from chunking import split_code
+
+
+def _big_function(lines: int) -> str:
+    body = []
+    for i in range(lines):
+        if i % 40 == 0:
+            body.append("\n")
+        body.append(f"    value_{i} = helper(value_{i - 1}, {i})\n")
+    return "def big(x):\n" + ''.join(body) + "\n\ndef small():\n    return 1\n"
+
+
+def test_oversized_function_is_split_by_lines():
+    code = _big_function(2000)
+    for language in ('python', 'javascript'):
+        chunks = split_code(code, language, 6000)
+        assert len(chunks) > 1
+        assert max(len(chunk.code) for chunk in chunks) <= 6000
+        assert ''.join(chunk.code for chunk in chunks) == code
+
+
+def test_start_lines_follow_the_source():
+    code = _big_function(2000)
+    lines = code.splitlines(keepends=True)
+    for chunk in split_code(code, 'python', 6000):
+        assert ''.join(lines[chunk.start_line - 1:]).startswith(chunk.code)
+
+
+def _many_functions(count: int, edited: int = -1, extra_lines: int = 0) -> str:
+    functions = []
+    for i in range(count):
+        body_lines = 8 + (extra_lines if i == edited else 0)
+        body = ''.join(f"    y{j} = compute(x, {j}) + {i}\n" for j in range(body_lines))
+        functions.append(f"def func_{i}(x):\n{body}    return y0\n\n\n")
+    return ''.join(functions)
+
+
+def test_editing_one_function_keeps_other_chunk_digests():
+    before = split_code(_many_functions(60), 'python', 3000)
+    after = split_code(_many_functions(60, edited=2, extra_lines=6), 'python', 3000)
+    assert len(before) > 1
+
+    before_digests = {chunk.digest('python', 'explain') for chunk in before}
+    changed = [chunk for chunk in after if chunk.digest('python', 'explain') not in before_digests]
+    assert changed
+    assert all('func_2' in chunk.code for chunk in changed)
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+import prefetch
+from ai_service import CodeContext, CompletionResult
+from prefetch import CompletionPrefetcher, predict_follow_up
+from shared_cache import SharedCache
+
+
+class SlowService:
+    """Stands in for AIService; completions take `delay` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def get_code_completion(self, context, local_only=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return CompletionResult(completion="()", confidence=0.9, model_used="stub",
+                                processing_time=self.delay, provider="ollama")
+
+
+def _context() -> CodeContext:
+    return CodeContext(file_path="a.py", language="python", cursor_position=5, prefix="print", suffix="")
+
+
+def _result(completion: str) -> CompletionResult:
+    return CompletionResult(completion=completion, confidence=0.9, model_used="stub",
+                            processing_time=0.1, provider="ollama")
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out waiting for prefetch"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    cache = SharedCache(path=str(tmp_path / 'cache.sqlite3'), max_entries=100, ttl=60)
+    monkeypatch.setattr(prefetch, 'shared_cache', cache)
+    return cache
+
+
+def _prefetcher(monkeypatch, service, ttl: float = 30) -> CompletionPrefetcher:
+    monkeypatch.setattr(prefetch, 'get_ai_service', lambda: service)
+    return CompletionPrefetcher(enabled=True, ttl=ttl, max_entries=16, max_concurrent=1)
+
+
+def test_live_request_cancels_inflight_prefetch(shared, monkeypatch):
+    prefetcher = _prefetcher(monkeypatch, SlowService(delay=5))
+    prefetcher.schedule(_context(), _result("("))
+    _wait_for(lambda: shared.counter_total(prefetcher.PREFETCH_COUNTER) == 1)
+    futures = list(prefetcher._inflight.values())
+
+    with prefetcher.live_request():
+        assert shared.counter_total(prefetcher.LIVE_COUNTER) == 1
+
+    _wait_for(lambda: all(future.done() for future in futures))
+    assert all(future.cancelled() for future in futures)
+    _wait_for(lambda: shared.counter_total(prefetcher.PREFETCH_COUNTER) == 0)
+    assert prefetcher.get_stats()["cancelled"] == 1
+    assert shared.counter_total(prefetcher.LIVE_COUNTER) == 0
+
+
+def test_prefetch_skipped_while_another_worker_is_live(shared, monkeypatch):
+    service = SlowService(delay=0)
+    prefetcher = _prefetcher(monkeypatch, service)
+    shared.adjust_counter(prefetcher.LIVE_COUNTER, 1)
+
+    prefetcher.schedule(_context(), _result("("))
+    _wait_for(lambda: not prefetcher._inflight)
+    assert service.calls == 0
+    assert prefetcher.get_stats()["skipped_busy"] == 1
+
+
+def test_shared_prefetch_hit_and_expiry(shared, monkeypatch):
+    prefetcher = _prefetcher(monkeypatch, SlowService(delay=0), ttl=0.2)
+    prefetcher.schedule(_context(), _result("("))
+    _wait_for(lambda: prefetcher.get_stats()["completed"] == 1)
+
+    follow_up = predict_follow_up(_context(), "(")
+    other_worker = CompletionPrefetcher(enabled=True, ttl=0.2, max_entries=16, max_concurrent=1)
+    assert other_worker.lookup(follow_up).completion == "()"
+    assert other_worker.get_stats()["hits"] == 1
+    # Not written to the long-lived completion namespace
+    assert shared.get('completion', follow_up.cache_key()) is None
+
+    time.sleep(0.3)
+    assert other_worker.lookup(follow_up) is None
+    assert other_worker.get_stats()["misses"] == 1
@@ -0,0 +1,46 @@
+from semantic_cache import ast_fingerprint
+
+
+def test_preprocessor_lines_are_not_comments():
+    a = "#include <stdio.h>\n#define N 10\nint a[N];"
+    b = "#include <math.h>\n#define N 99999\nint a[N];"
+    assert ast_fingerprint(a, 'cpp') != ast_fingerprint(b, 'cpp')
+
+
+def test_comment_markers_inside_strings_are_kept():
+    a = 'fetch("http://a.com/x"); deleteAllUsers();'
+    b = 'fetch("http://b.org"); listUsers(1, 2);'
+    assert ast_fingerprint(a, 'javascript') != ast_fingerprint(b, 'javascript')
+
+
+def test_renames_and_comments_still_match():
+    a = 'function add(a, b) { return a + b; } // sum'
+    b = 'function plus(x, y) {\n  /* add */ return x + y;\n}'
+    assert ast_fingerprint(a, 'javascript') == ast_fingerprint(b, 'javascript')
+
+
+def test_python_renames_match_and_strings_differ():
+    assert ast_fingerprint("def f(x):\n    return x + 1\n", 'python') == \
+        ast_fingerprint("def g(y):  # inc\n    return y + 1\n", 'python')
+    assert ast_fingerprint("s = 'a # b'", 'ruby') != ast_fingerprint("s = 'a # c'", 'ruby')
+
+
+def test_free_names_are_kept():
+    assert ast_fingerprint("delete_all_users(db)", 'python') != ast_fingerprint("list_all_users(db)", 'python')
+    assert ast_fingerprint("deleteAllUsers(db);", 'javascript') != ast_fingerprint("listUsers(db);", 'javascript')
+
+
+def test_types_are_kept():
+    assert ast_fingerprint("int x = 5;", 'cpp') != ast_fingerprint("float x = 5;", 'cpp')
+    assert ast_fingerprint("std::vector<int> v;", 'cpp') != ast_fingerprint("std::list<int> v;", 'cpp')
+    assert ast_fingerprint("def f(x: int):\n    return x\n", 'python') != \
+        ast_fingerprint("def f(x: str):\n    return x\n", 'python')
+
+
+def test_bound_names_are_renamed():
+    assert ast_fingerprint("const total = items.length; log(total);", 'javascript') == \
+        ast_fingerprint("const count = items.length; log(count);", 'javascript')
+    assert ast_fingerprint("int area(int w, int h) { return w * h; }", 'cpp') == \
+        ast_fingerprint("int size(int a, int b) { return a * b; }", 'cpp')
+    assert ast_fingerprint("import numpy as np\nnp.zeros(3)\n", 'python') == \
+        ast_fingerprint("import numpy as xp\nxp.zeros(3)\n", 'python')
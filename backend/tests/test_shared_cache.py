@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from shared_cache import SharedCache
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(path=str(tmp_path / 'cache.sqlite3'), max_entries=100, ttl=60)
+
+
+def test_try_increment_enforces_limit(cache):
+    assert cache.try_increment('prefetches', 2)
+    assert cache.try_increment('prefetches', 2)
+    assert not cache.try_increment('prefetches', 2)
+    assert cache.counter_total('prefetches') == 2
+
+    cache.adjust_counter('prefetches', -1)
+    assert cache.try_increment('prefetches', 2)
+
+
+def test_try_increment_refuses_while_unless_counter_is_set(cache):
+    cache.adjust_counter('live_requests', 1)
+    assert not cache.try_increment('prefetches', 1, unless='live_requests')
+    assert cache.counter_total('prefetches') == 0
+
+    cache.adjust_counter('live_requests', -1)
+    assert cache.try_increment('prefetches', 1, unless='live_requests')
+
+
+def test_dead_worker_counts_are_dropped(cache):
+    code = (
+        "import sys; sys.path.insert(0, sys.argv[1]); from shared_cache import SharedCache; "
+        "SharedCache(sys.argv[2], 100, 60).adjust_counter('live_requests', 1)"
+    )
+    subprocess.run([sys.executable, '-c', code, BACKEND_DIR, cache.path], check=True)
+    cache.adjust_counter('live_requests', 1)
+
+    # Only this process is still alive
+    assert cache.counter_total('live_requests') == 1
+    rows = cache._connect().execute("SELECT pid FROM counters WHERE name = 'live_requests'").fetchall()
+    assert rows == [(os.getpid(),)]
+
+
+def test_per_entry_ttl(cache):
+    cache.set('prefetch', 'short', {'v': 1}, ttl=0.05)
+    cache.set('completion', 'long', {'v': 2})
+    time.sleep(0.1)
+    assert cache.get('prefetch', 'short') is None
+    assert cache.get('completion', 'long') == {'v': 2}
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from config import Config
+
+
+class BackendStats:
+    """Connection and request counters for one upstream backend"""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connection_waits = 0  # Requests that queued because the pool was full
+        self.connection_wait_seconds = 0.0
+        self.connect_seconds = 0.0
+        self.request_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_rate": round(self.connections_reused / connections, 4) if connections else 0.0,
+            "connection_waits": self.connection_waits,
+            "avg_connection_wait_ms": round(self.connection_wait_seconds / self.connection_waits * 1000, 2) if self.connection_waits else 0.0,
+            "avg_connect_ms": round(self.connect_seconds / self.connections_created * 1000, 2) if self.connections_created else 0.0,
+            "avg_request_ms": round(self.request_seconds / self.requests * 1000, 2) if self.requests else 0.0
+        }
+
+
+class UpstreamPool:
+    """Pooled keep-alive aiohttp sessions, one per local backend
+
+    Each backend gets its own connector: TCP with per-host limits and DNS
+    caching, or a Unix domain socket when one is configured. aiohttp trace
+    hooks record time spent waiting for a free connection separately from
+    time spent on the request itself, so /api/status shows whether we are
+    short of sockets or waiting on the model.
+    """
+
+    BACKENDS = {
+        'ollama': ('OLLAMA_BASE_URL', 'OLLAMA_UNIX_SOCKET'),
+        'lm_studio': ('LM_STUDIO_BASE_URL', 'LM_STUDIO_UNIX_SOCKET')
+    }
+
+    def __init__(self):
+        self._sessions: Dict[str, object] = {}
+        self._connectors: Dict[str, object] = {}
+        self._stats: Dict[str, BackendStats] = {name: BackendStats() for name in self.BACKENDS}
+
+    def unix_socket(self, backend: str) -> Optional[str]:
+        return getattr(Config, self.BACKENDS[backend][1]) or None
+
+    def base_url(self, backend: str) -> str:
+        """Configured base URL; over a Unix socket only its path is meaningful"""
+        url = getattr(Config, self.BACKENDS[backend][0]).rstrip('/')
+        if self.unix_socket(backend):
+            parts = urlsplit(url)
+            return urlunsplit(('http', 'localhost', parts.path, '', ''))
+        return url
+
+    async def session(self, backend: str):
+        """Get or create the pooled session for a backend"""
+        session = self._sessions.get(backend)
+        if session is None or session.closed:
+            import aiohttp  # Deferred: keeps process startup fast
+
+            socket_path = self.unix_socket(backend)
+            if socket_path:
+                connector = aiohttp.UnixConnector(
+                    path=socket_path,
+                    limit=Config.LOCAL_POOL_LIMIT,
+                    keepalive_timeout=Config.LOCAL_KEEPALIVE_TIMEOUT
+                )
+            else:
+                connector = aiohttp.TCPConnector(
+                    limit=Config.LOCAL_POOL_LIMIT,
+                    limit_per_host=Config.LOCAL_POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=Config.LOCAL_KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=Config.LOCAL_DNS_CACHE_TTL
+                )
+            # First byte and body read are bounded per request in LocalLLMService;
+            # the session limits are only a backstop derived from those phases
+            timeout = aiohttp.ClientTimeout(
+                total=Config.LOCAL_CONNECT_TIMEOUT + Config.LOCAL_FIRST_BYTE_TIMEOUT + Config.LOCAL_READ_TIMEOUT,
+                sock_connect=Config.LOCAL_CONNECT_TIMEOUT,
+                sock_read=max(Config.LOCAL_FIRST_BYTE_TIMEOUT, Config.LOCAL_READ_TIMEOUT)
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                trace_configs=[self._trace_config(aiohttp, self._stats[backend])]
+            )
+            self._sessions[backend] = session
+            self._connectors[backend] = connector
+        return session
+
+    @staticmethod
+    def _trace_config(aiohttp, stats: BackendStats):
+        """aiohttp trace hooks feeding a BackendStats"""
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.request_started = time.perf_counter()
+            stats.requests += 1
+            stats.in_flight += 1
+
+        async def on_request_end(session, ctx, params):
+            stats.in_flight -= 1
+            stats.request_seconds += time.perf_counter() - ctx.request_started
+
+        async def on_request_exception(session, ctx, params):
+            stats.in_flight -= 1
+            stats.request_seconds += time.perf_counter() - ctx.request_started
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_started = time.perf_counter()
+
+        async def on_connection_queued_end(session, ctx, params):
+            stats.connection_waits += 1
+            stats.connection_wait_seconds += time.perf_counter() - ctx.queued_started
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            stats.connections_created += 1
+            stats.connect_seconds += time.perf_counter() - ctx.connect_started
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats.connections_reused += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_queued_start.append(on_connection_queued_start)
+        trace.on_connection_queued_end.append(on_connection_queued_end)
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def get_stats(self) -> Dict:
+        """Pool configuration and counters per backend"""
+        stats = {}
+        for backend, backend_stats in self._stats.items():
+            entry = backend_stats.as_dict()
+            entry["transport"] = "unix" if self.unix_socket(backend) else "tcp"
+            connector = self._connectors.get(backend)
+            if connector is not None:
+                entry["limit"] = connector.limit
+                entry["limit_per_host"] = connector.limit_per_host
+            stats[backend] = entry
+        return stats
+
+    async def close(self):
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+        self._connectors.clear()
+
+
+async def wait_with_timeout(awaitable, timeout: Optional[float], what: str):
+    """Await with an optional timeout, raising a readable error when it fires
+
+    Only this call's own deadline is relabelled; a timeout raised by the
+    awaitable itself (e.g. aiohttp's socket timeouts) propagates unchanged.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if task not in done:
+        task.cancel()
+        raise Exception(f"{what} timed out after {timeout}s")
+    return task.result()